@@ -0,0 +1,52 @@
+"""Add alert scheduling columns and sent_job_alerts table
+
+Revision ID: 0262a9405ddf
+Revises: 50feb01be51c, enhanced_tables_v2
+Create Date: 2026-10-17 09:12:41.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0262a9405ddf'
+# Also merges the two heads that branched from 66419ca24d01
+down_revision: Union[str, Sequence[str], None] = ('50feb01be51c', 'enhanced_tables_v2')
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user_preferences', sa.Column('alerts_enabled', sa.Boolean(), server_default=sa.true(), nullable=False))
+    op.add_column('user_preferences', sa.Column('alert_interval_minutes', sa.Integer(), nullable=True))
+    op.add_column('user_preferences', sa.Column('next_alert_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('user_preferences', sa.Column('last_alert_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('user_preferences', sa.Column('alert_claim_token', sa.String(length=36), nullable=True))
+    op.create_index('ix_user_preferences_alert_due', 'user_preferences', ['alerts_enabled', 'next_alert_at'], unique=False)
+
+    op.create_table('sent_job_alerts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('job_fingerprint', sa.String(length=64), nullable=False),
+        sa.Column('sent_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'job_fingerprint', name='uq_sent_job_alerts_user_job')
+    )
+    op.create_index(op.f('ix_sent_job_alerts_id'), 'sent_job_alerts', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_sent_job_alerts_id'), table_name='sent_job_alerts')
+    op.drop_table('sent_job_alerts')
+
+    op.drop_index('ix_user_preferences_alert_due', table_name='user_preferences')
+    op.drop_column('user_preferences', 'alert_claim_token')
+    op.drop_column('user_preferences', 'last_alert_at')
+    op.drop_column('user_preferences', 'next_alert_at')
+    op.drop_column('user_preferences', 'alert_interval_minutes')
+    op.drop_column('user_preferences', 'alerts_enabled')
@@ -0,0 +1,38 @@
+"""Add job matching columns to job_listings
+
+Revision ID: 3b960737fbcc
+Revises: f486623f6504
+Create Date: 2026-10-17 16:02:41.518302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b960737fbcc'
+down_revision: Union[str, Sequence[str], None] = 'f486623f6504'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('job_listings', sa.Column('matched_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('job_listings', sa.Column('match_claim_token', sa.String(length=36), nullable=True))
+    op.add_column('job_listings', sa.Column('match_lease_until', sa.DateTime(timezone=True), nullable=True))
+    # Listings stored before the matcher existed are not announced to everyone at once
+    op.execute("UPDATE job_listings SET matched_at = COALESCE(created_at, CURRENT_TIMESTAMP)")
+    op.create_index('ix_job_listings_unmatched', 'job_listings', ['matched_at', 'created_at'], unique=False)
+    op.create_index('ix_user_job_results_job_listing_user', 'user_job_results', ['job_listing_id', 'user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_job_results_job_listing_user', table_name='user_job_results')
+    op.drop_index('ix_job_listings_unmatched', table_name='job_listings')
+    op.drop_column('job_listings', 'match_lease_until')
+    op.drop_column('job_listings', 'match_claim_token')
+    op.drop_column('job_listings', 'matched_at')
@@ -0,0 +1,105 @@
+"""Move resume binaries from user_preferences into the content-addressed resume store
+
+Revision ID: 6a6c67934a4a
+Revises: b87272abe563
+Create Date: 2026-10-17 13:02:41.518207
+
+"""
+from typing import Sequence, Union
+import hashlib
+import os
+import tempfile
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a6c67934a4a'
+down_revision: Union[str, Sequence[str], None] = 'b87272abe563'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _store_root():
+    return os.path.abspath(os.getenv("RESUME_STORE_PATH", "./resume_store"))
+
+
+def _blob_path(digest):
+    # Frozen copy of the resume_store layout as of this revision
+    return os.path.join(_store_root(), digest[:2], digest[2:4], digest)
+
+
+def _put_blob(data):
+    digest = hashlib.sha256(data).hexdigest()
+    path = _blob_path(digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    return digest
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user_preferences', sa.Column('resume_sha256', sa.String(length=64), nullable=True))
+
+    conn = op.get_bind()
+    user_preferences = sa.table(
+        'user_preferences',
+        sa.column('id', sa.Integer), sa.column('resume_data', sa.LargeBinary),
+        sa.column('resume_sha256', sa.String),
+    )
+
+    # One row at a time, so at most one resume is held in memory
+    last_id = 0
+    while True:
+        row = conn.execute(
+            sa.select(user_preferences.c.id, user_preferences.c.resume_data)
+            .where(user_preferences.c.id > last_id, user_preferences.c.resume_data.isnot(None))
+            .order_by(user_preferences.c.id)
+            .limit(1)
+        ).first()
+        if row is None:
+            break
+        conn.execute(
+            user_preferences.update().where(user_preferences.c.id == row.id)
+            .values(resume_sha256=_put_blob(bytes(row.resume_data)))
+        )
+        last_id = row.id
+
+    with op.batch_alter_table('user_preferences') as batch_op:
+        batch_op.drop_column('resume_data')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('user_preferences', sa.Column('resume_data', sa.LargeBinary(), nullable=True))
+
+    conn = op.get_bind()
+    user_preferences = sa.table(
+        'user_preferences',
+        sa.column('id', sa.Integer), sa.column('resume_data', sa.LargeBinary),
+        sa.column('resume_sha256', sa.String),
+    )
+    rows = conn.execute(
+        sa.select(user_preferences.c.id, user_preferences.c.resume_sha256)
+        .where(user_preferences.c.resume_sha256.isnot(None))
+    ).fetchall()
+    for row in rows:
+        path = _blob_path(row.resume_sha256)
+        if not os.path.exists(path):
+            print(f"Resume {row.resume_sha256} for preference {row.id} is missing from the store")
+            continue
+        with open(path, "rb") as f:
+            conn.execute(
+                user_preferences.update().where(user_preferences.c.id == row.id).values(resume_data=f.read())
+            )
+
+    # Blobs stay in the store; they are harmless and make re-upgrading cheap
+    with op.batch_alter_table('user_preferences') as batch_op:
+        batch_op.drop_column('resume_sha256')
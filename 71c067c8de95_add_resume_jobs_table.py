@@ -0,0 +1,48 @@
+"""Add resume_jobs table
+
+Revision ID: 71c067c8de95
+Revises: 6a6c67934a4a
+Create Date: 2026-10-17 14:21:09.730164
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '71c067c8de95'
+down_revision: Union[str, Sequence[str], None] = '6a6c67934a4a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('resume_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('resume_filename', sa.String(length=255), nullable=False),
+        sa.Column('resume_sha256', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.String(length=20), server_default='pending', nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('claim_token', sa.String(length=36), nullable=True),
+        sa.Column('skills', sa.Text(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_resume_jobs_id'), 'resume_jobs', ['id'], unique=False)
+    op.create_index('ix_resume_jobs_due', 'resume_jobs', ['status', 'next_attempt_at'], unique=False)
+    op.create_index('ix_resume_jobs_user_id_id', 'resume_jobs', ['user_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_resume_jobs_user_id_id', table_name='resume_jobs')
+    op.drop_index('ix_resume_jobs_due', table_name='resume_jobs')
+    op.drop_index(op.f('ix_resume_jobs_id'), table_name='resume_jobs')
+    op.drop_table('resume_jobs')
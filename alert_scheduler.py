@@ -0,0 +1,311 @@
+"""
+Background job alert scheduler. Due preferences are claimed in batches with a
+lease (next_alert_at pushed forward plus a claim token), so several scheduler
+processes can share user_preferences without double-sending. Each batch is
+grouped into query buckets so model calls scale with distinct searches, not users.
+
+Run with `python -m backend.alert_scheduler` or set ALERT_SCHEDULER_ENABLED=True.
+"""
+import argparse
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, load_only
+from starlette.concurrency import run_in_threadpool
+
+from . import models, database
+from .gemini_client import GeminiUnavailable, search_jobs_with_resume_async
+from .notifications import enqueue_whatsapp_message, format_alert_digest_message, make_idempotency_key
+from .job_ranking import rank_jobs_for_users
+from .query_planner import QueryBucket, plan_query_buckets
+
+load_dotenv()
+
+ALERT_SCHEDULER_ENABLED = os.getenv("ALERT_SCHEDULER_ENABLED", "False").lower() == "true"
+ALERT_INTERVAL_MINUTES = int(os.getenv("ALERT_INTERVAL_MINUTES", 24 * 60))
+ALERT_POLL_SECONDS = int(os.getenv("ALERT_POLL_SECONDS", 60))
+ALERT_BATCH_SIZE = int(os.getenv("ALERT_BATCH_SIZE", 500))
+ALERT_MAX_CONCURRENT_SEARCHES = int(os.getenv("ALERT_MAX_CONCURRENT_SEARCHES", 20))
+ALERT_CLAIM_LEASE_MINUTES = int(os.getenv("ALERT_CLAIM_LEASE_MINUTES", 30))
+# How soon preferences whose search failed (model outage, rate limit) are tried again
+ALERT_RETRY_MINUTES = int(os.getenv("ALERT_RETRY_MINUTES", 10))
+
+# Only the columns the scheduler needs
+_PREFERENCE_COLUMNS = (
+    models.UserPreference.id,
+    models.UserPreference.user_id,
+    models.UserPreference.job_title,
+    models.UserPreference.location,
+    models.UserPreference.skills,
+    models.UserPreference.preferred_companies,
+    models.UserPreference.whatsapp_number,
+    models.UserPreference.resume_content,
+    models.UserPreference.alert_interval_minutes,
+)
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _split(value: Optional[str]) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()] if value else []
+
+def _due_filter(now: datetime):
+    return and_(
+        models.UserPreference.alerts_enabled == True,
+        or_(
+            models.UserPreference.next_alert_at == None,
+            models.UserPreference.next_alert_at <= now
+        )
+    )
+
+def claim_due_preferences(
+    db: Session,
+    batch_size: int = ALERT_BATCH_SIZE,
+    lease_minutes: int = ALERT_CLAIM_LEASE_MINUTES
+) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+    """
+    Claim up to batch_size due preferences for this process.
+    Returns the claim token and plain-dict snapshots of the claimed rows.
+    """
+    now = _utcnow()
+    due = _due_filter(now)
+
+    # SKIP LOCKED lets concurrent schedulers on Postgres pick disjoint batches;
+    # the due filter on the UPDATE guards databases that ignore it
+    candidate_ids = [
+        row.id for row in db.query(models.UserPreference.id)
+        .filter(due)
+        .order_by(models.UserPreference.next_alert_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    ]
+    if not candidate_ids:
+        db.rollback()
+        return None, []
+
+    token = str(uuid.uuid4())
+    db.query(models.UserPreference).filter(
+        models.UserPreference.id.in_(candidate_ids), due
+    ).update(
+        {
+            models.UserPreference.next_alert_at: now + timedelta(minutes=lease_minutes),
+            models.UserPreference.alert_claim_token: token,
+        },
+        synchronize_session=False
+    )
+    db.commit()
+
+    rows = db.query(models.UserPreference).options(load_only(*_PREFERENCE_COLUMNS)).filter(
+        models.UserPreference.id.in_(candidate_ids),
+        models.UserPreference.alert_claim_token == token
+    ).all()
+    user_names = dict(
+        db.query(models.User.id, models.User.name).filter(
+            models.User.id.in_({row.user_id for row in rows})
+        ).all()
+    ) if rows else {}
+
+    claimed = [
+        {
+            "id": row.id,
+            "user_id": row.user_id,
+            "user_name": user_names.get(row.user_id, "there"),
+            "job_title": row.job_title,
+            "location": row.location,
+            "skills": _split(row.skills),
+            "preferred_companies": _split(row.preferred_companies),
+            "whatsapp_number": row.whatsapp_number,
+            "resume_content": row.resume_content,
+            "interval_minutes": row.alert_interval_minutes or ALERT_INTERVAL_MINUTES,
+        }
+        for row in rows
+    ]
+    return token, claimed
+
+def filter_unsent_jobs(db: Session, user_id: int, jobs: List[dict]) -> List[dict]:
+    """Drop jobs that were already sent to this user in an earlier alert"""
+    if not jobs:
+        return []
+    fingerprints = [models.job_fingerprint(job) for job in jobs]
+    already_sent = {
+        row.job_fingerprint for row in db.query(models.SentJobAlert.job_fingerprint).filter(
+            models.SentJobAlert.user_id == user_id,
+            models.SentJobAlert.job_fingerprint.in_(fingerprints)
+        )
+    }
+    new_jobs = []
+    seen = set(already_sent)
+    for job, fingerprint in zip(jobs, fingerprints):
+        if fingerprint not in seen:
+            seen.add(fingerprint)
+            new_jobs.append(job)
+    return new_jobs
+
+def complete_preference(db: Session, pref: Dict[str, Any], token: str, new_jobs: List[dict]) -> int:
+    """
+    Record the jobs as sent, queue a digest of the ones no other run recorded first and
+    schedule the next run, in one transaction. Returns the number of jobs in the digest.
+    """
+    now = _utcnow()
+    fingerprints = [models.job_fingerprint(job) for job in new_jobs]
+    inserted = database.insert_ignoring_conflicts(db, models.SentJobAlert, [
+        {"user_id": pref["user_id"], "job_fingerprint": fingerprint}
+        for fingerprint in fingerprints
+    ], ("user_id", "job_fingerprint"))
+    inserted_fingerprints = {row["job_fingerprint"] for row in inserted}
+    sent_jobs = [job for job, fingerprint in zip(new_jobs, fingerprints) if fingerprint in inserted_fingerprints]
+    if sent_jobs:
+        message = format_alert_digest_message(pref["user_name"], pref["job_title"], pref["location"], sent_jobs)
+        # Re-running a claim that died before commit queues the same key, so it is sent once
+        idempotency_key = make_idempotency_key("alert", pref["user_id"], *sorted(inserted_fingerprints))
+        enqueue_whatsapp_message(db, pref["whatsapp_number"], message, idempotency_key, user_id=pref["user_id"])
+    db.query(models.UserPreference).filter(
+        models.UserPreference.id == pref["id"],
+        models.UserPreference.alert_claim_token == token
+    ).update(
+        {
+            models.UserPreference.last_alert_at: now,
+            models.UserPreference.next_alert_at: now + timedelta(minutes=pref["interval_minutes"]),
+            models.UserPreference.alert_claim_token: None,
+        },
+        synchronize_session=False
+    )
+    db.commit()
+    return len(sent_jobs)
+
+def retry_preferences(db: Session, prefs: List[Dict[str, Any]], token: str, delay_minutes: int = ALERT_RETRY_MINUTES):
+    """Release claimed preferences to run again shortly, without counting as an alert"""
+    db.query(models.UserPreference).filter(
+        models.UserPreference.id.in_([pref["id"] for pref in prefs]),
+        models.UserPreference.alert_claim_token == token
+    ).update(
+        {
+            models.UserPreference.next_alert_at: _utcnow() + timedelta(minutes=delay_minutes),
+            models.UserPreference.alert_claim_token: None,
+        },
+        synchronize_session=False
+    )
+    db.commit()
+
+
+class AlertScheduler:
+    """Runs one search per query bucket of due preferences, with a bounded number of concurrent model calls"""
+
+    def __init__(
+        self,
+        batch_size: int = ALERT_BATCH_SIZE,
+        max_concurrent_searches: int = ALERT_MAX_CONCURRENT_SEARCHES,
+        poll_seconds: int = ALERT_POLL_SECONDS
+    ):
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self._search_slots = asyncio.Semaphore(max_concurrent_searches)
+
+    def _claim_batch(self):
+        with database.SessionLocal() as db:
+            return claim_due_preferences(db, self.batch_size)
+
+    def _unsent_jobs(self, pref: Dict[str, Any], jobs: List[dict]) -> List[dict]:
+        with database.SessionLocal() as db:
+            return filter_unsent_jobs(db, pref["user_id"], jobs)
+
+    def _complete(self, pref: Dict[str, Any], token: str, new_jobs: List[dict]) -> int:
+        with database.SessionLocal() as db:
+            return complete_preference(db, pref, token, new_jobs)
+
+    def _retry(self, prefs: List[Dict[str, Any]], token: str):
+        with database.SessionLocal() as db:
+            retry_preferences(db, prefs, token)
+
+    async def _notify_member(self, pref: Dict[str, Any], token: str, ranked_jobs: List[dict]) -> int:
+        new_jobs = await run_in_threadpool(self._unsent_jobs, pref, ranked_jobs)
+        return await run_in_threadpool(self._complete, pref, token, new_jobs)
+
+    async def process_bucket(self, bucket: QueryBucket, token: str) -> List[Any]:
+        """
+        Run one shared search for a query bucket, then rank and send per member.
+        Returns one result per member: jobs sent, or the exception that member hit.
+        """
+        members = [pref for pref in bucket.members if pref["whatsapp_number"]]
+        ranked = {}
+        if members:
+            # No per-user skills or resume in the prompt, so every member shares the call and the cache
+            try:
+                async with self._search_slots:
+                    jobs = await search_jobs_with_resume_async(
+                        job_title=bucket.job_title,
+                        location=bucket.location,
+                        raise_errors=True
+                    )
+            except GeminiUnavailable:
+                # A failed search is not "no new jobs"; completing would push these members a whole interval out
+                await run_in_threadpool(self._retry, bucket.members, token)
+                raise
+            # Personalize locally: one vectorized scoring pass for the whole bucket
+            ranked = dict(zip((pref["id"] for pref in members), rank_jobs_for_users(jobs, members)))
+        return await asyncio.gather(
+            *(
+                self._notify_member(pref, token, ranked[pref["id"]]) if pref["id"] in ranked
+                else run_in_threadpool(self._complete, pref, token, [])
+                for pref in bucket.members
+            ),
+            return_exceptions=True
+        )
+
+    async def run_once(self) -> Dict[str, int]:
+        """Process every preference that is currently due, one claimed batch at a time"""
+        stats = {"claimed": 0, "searches": 0, "notified": 0, "jobs_sent": 0, "errors": 0}
+        while True:
+            token, batch = await run_in_threadpool(self._claim_batch)
+            if not batch:
+                break
+            stats["claimed"] += len(batch)
+            buckets = plan_query_buckets(batch)
+            stats["searches"] += sum(1 for b in buckets if any(p["whatsapp_number"] for p in b.members))
+            bucket_results = await asyncio.gather(
+                *(self.process_bucket(bucket, token) for bucket in buckets),
+                return_exceptions=True
+            )
+            for bucket, results in zip(buckets, bucket_results):
+                if isinstance(results, Exception):
+                    results = [results] * len(bucket.members)
+                for pref, result in zip(bucket.members, results):
+                    if isinstance(result, Exception):
+                        # Released for a retry if its search failed; otherwise the claim is left in place
+                        # and the row is retried when its lease expires
+                        stats["errors"] += 1
+                        print(f"Alert run failed for preference {pref['id']}: {result}")
+                    elif result:
+                        stats["notified"] += 1
+                        stats["jobs_sent"] += result
+        return stats
+
+    async def run_forever(self):
+        while True:
+            try:
+                stats = await self.run_once()
+                if stats["claimed"]:
+                    print(f"Alert scheduler run: {stats}")
+            except Exception as e:
+                print(f"Alert scheduler error: {e}")
+            await asyncio.sleep(self.poll_seconds)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run saved job alert searches")
+    parser.add_argument("--once", action="store_true", help="Process due preferences once and exit")
+    args = parser.parse_args()
+
+    scheduler = AlertScheduler()
+    if args.once:
+        print(asyncio.run(scheduler.run_once()))
+    else:
+        asyncio.run(scheduler.run_forever())
+
+if __name__ == "__main__":
+    main()
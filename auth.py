@@ -1,11 +1,13 @@
 from fastapi import HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, load_only
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, Optional
 import os
 from . import models, database
+from .search_cache import MemoryCache
 
 # JWT Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
@@ -14,6 +16,100 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 security = HTTPBearer()
 
+# Accounts allowed to use the /admin endpoints (comma-separated emails)
+ADMIN_EMAILS = frozenset(
+    email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()
+)
+
+# Identity cache: users and their preferences, so hot endpoints skip DB reads.
+# Invalidation is per process, so other workers see changes within the TTL.
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", 60))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", 5000))
+
+_identity_cache = MemoryCache(max_entries=AUTH_CACHE_MAX_ENTRIES, ttl_seconds=AUTH_CACHE_TTL_SECONDS)
+
+
+class _Snapshot:
+    """Plain copy of selected model fields that can outlive its session"""
+
+    fields = ()
+
+    def __init__(self, **values):
+        for field in self.fields:
+            setattr(self, field, values.get(field))
+
+    @classmethod
+    def from_model(cls, instance):
+        return cls(**{field: getattr(instance, field) for field in cls.fields})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.fields}
+
+
+class UserSnapshot(_Snapshot):
+    """The fields request handlers use from a User"""
+
+    fields = ("id", "name", "email", "linkedin_url")
+
+
+class PreferenceSnapshot(_Snapshot):
+    """
+    The fields searches and the preferences page use from a UserPreference. The resume
+    text stays deferred: only searches need it, and it would bloat every cache entry.
+    """
+
+    fields = (
+        "id", "user_id", "job_title", "location", "skills", "preferred_companies",
+        "whatsapp_number", "linkedin_url", "email", "resume_filename", "resume_sha256",
+    )
+
+
+def _user_key(email: str) -> str:
+    return f"user:{email}"
+
+def _preferences_key(user_id: int) -> str:
+    return f"prefs:{user_id}"
+
+def invalidate_user(email: str):
+    _identity_cache.delete(_user_key(email))
+
+def invalidate_preferences(user_id: int):
+    _identity_cache.delete(_preferences_key(user_id))
+
+@event.listens_for(Session, "after_flush")
+def _collect_password_changes(session, flush_context):
+    # Covers every password change, since they all go through User.set_password
+    for target in session.dirty:
+        if isinstance(target, models.User) and target.email and inspect(target).attrs.password_hash.history.has_changes():
+            session.info.setdefault("password_changed_emails", set()).add(target.email)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_password_change(session):
+    # Evicting before the commit would let a concurrent request cache the old row again
+    for email in session.info.pop("password_changed_emails", ()):
+        invalidate_user(email)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_password_changes(session):
+    session.info.pop("password_changed_emails", None)
+
+def get_preferences_snapshot(db: Session, user_id: int) -> Optional[PreferenceSnapshot]:
+    """The user's preferences, from the identity cache when possible"""
+    cached = _identity_cache.get(_preferences_key(user_id))
+    if cached is not None:
+        # An empty dict records that the user has no preferences yet
+        return PreferenceSnapshot(**cached) if cached else None
+    
+    prefs = db.query(models.UserPreference).options(
+        load_only(*(getattr(models.UserPreference, field) for field in PreferenceSnapshot.fields))
+    ).filter(models.UserPreference.user_id == user_id).first()
+    snapshot = PreferenceSnapshot.from_model(prefs) if prefs else None
+    _identity_cache.set(_preferences_key(user_id), snapshot.as_dict() if snapshot else {})
+    return snapshot
+
+def identity_cache_stats() -> Dict[str, Any]:
+    return _identity_cache.describe()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -38,10 +134,22 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security),
     except JWTError:
         raise credentials_exception
     
+    cached = _identity_cache.get(_user_key(email))
+    if cached is not None:
+        return UserSnapshot(**cached)
+    
     user = db.query(models.User).filter(models.User.email == email).first()
     if user is None:
         raise credentials_exception
-    return user
+    snapshot = UserSnapshot.from_model(user)
+    _identity_cache.set(_user_key(email), snapshot.as_dict())
+    return snapshot
 
 def get_current_user(token: str = Depends(security), db: Session = Depends(database.get_db)):
     return verify_token(token, db)
+
+def get_admin_user(current_user: UserSnapshot = Depends(get_current_user)):
+    """The current user, if their email is in ADMIN_EMAILS"""
+    if (current_user.email or "").lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
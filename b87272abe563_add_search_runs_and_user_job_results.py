@@ -0,0 +1,54 @@
+"""Add search_runs and user_job_results tables
+
+Revision ID: b87272abe563
+Revises: e635b1dc11a7
+Create Date: 2026-10-17 11:26:08.731942
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b87272abe563'
+down_revision: Union[str, Sequence[str], None] = 'e635b1dc11a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('search_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('job_title', sa.String(length=100), nullable=False),
+        sa.Column('location', sa.String(length=100), nullable=False),
+        sa.Column('total_jobs', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_search_runs_id'), 'search_runs', ['id'], unique=False)
+    op.create_index('ix_search_runs_user_id_id', 'search_runs', ['user_id', 'id'], unique=False)
+
+    op.create_table('user_job_results',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('search_run_id', sa.Integer(), nullable=False),
+        sa.Column('job_listing_id', sa.Integer(), nullable=False),
+        sa.Column('rank', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('search_run_id', 'job_listing_id', name='uq_user_job_results_run_job')
+    )
+    op.create_index('ix_user_job_results_history', 'user_job_results', ['user_id', sa.text('search_run_id DESC'), 'rank'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_job_results_history', table_name='user_job_results')
+    op.drop_table('user_job_results')
+    op.drop_index('ix_search_runs_user_id_id', table_name='search_runs')
+    op.drop_index(op.f('ix_search_runs_id'), table_name='search_runs')
+    op.drop_table('search_runs')
@@ -0,0 +1,201 @@
+"""
+Concurrent write throughput of the database layer. Writer threads store search
+results the way /search-jobs does (record_search_run + commit) while reader
+threads page through job history. Each configuration runs in a fresh process
+on a scratch database, so database.py picks up its settings from the
+environment. "before" is SQLite's rollback journal with synchronous=FULL,
+SQLAlchemy's default pool and no write queue; "after" is the defaults in database.py.
+
+    python -m backend.benchmarks.db_writes --writers 16 --readers 8 --transactions 50
+    python -m backend.benchmarks.db_writes --config after --env SQLITE_SYNCHRONOUS=FULL
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+CONFIGS = {
+    "before": {
+        "SQLITE_JOURNAL_MODE": "DELETE",
+        "SQLITE_SYNCHRONOUS": "FULL",
+        "SQLITE_MMAP_SIZE": "0",
+        "DB_POOL_SIZE": "5",
+        "DB_MAX_OVERFLOW": "10",
+        "DB_POOL_RECYCLE": "-1",
+        "DB_POOL_PRE_PING": "False",
+        "SQLITE_SERIALIZE_WRITES": "False",
+    },
+    "after": {},
+}
+
+PACKAGE = __package__.rsplit(".", 1)[0]
+PACKAGE_PARENT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _jobs(writer: int, transaction: int, count: int) -> List[Dict[str, Any]]:
+    # Half the postings repeat across writers, as popular searches do
+    return [
+        {
+            "title": f"Engineer {index}" if index % 2 else f"Engineer {writer}-{transaction}-{index}",
+            "company": f"Company {index}",
+            "location": "Remote",
+            "description": "Build and run data pipelines in Python and SQL. " * 10,
+            "url": f"https://jobs.example.com/{writer}/{transaction}/{index}",
+            "application_url": f"https://jobs.example.com/{writer}/{transaction}/{index}/apply",
+            "salary_range": "$120k-$160k",
+            "job_type": "Full-time",
+            "experience_level": "Mid",
+            "posted_date": "2026-10-01",
+        }
+        for index in range(count)
+    ]
+
+def _latency_summary(seconds: List[float]) -> Dict[str, Any]:
+    if not seconds:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    p50, p95, p99 = np.percentile(np.array(seconds) * 1000, [50, 95, 99])
+    return {"p50_ms": round(p50, 1), "p95_ms": round(p95, 1), "p99_ms": round(p99, 1)}
+
+def run_worker(args) -> Dict[str, Any]:
+    """Runs inside the child process, configured by its environment"""
+    from sqlalchemy.exc import SQLAlchemyError
+
+    from .. import database, models
+    from ..job_store import get_user_job_history, record_search_run
+
+    models.Base.metadata.create_all(bind=database.engine)
+    with database.SessionLocal() as db:
+        # Nobody logs in, so skip hashing a password
+        users = [
+            models.User(name=f"Writer {i}", email=f"writer{i}@bench.local", password_hash="-") for i in range(args.writers)
+        ]
+        db.add_all(users)
+        db.commit()
+        user_ids = [user.id for user in users]
+
+    lock = threading.Lock()
+    commit_seconds: List[float] = []
+    read_seconds: List[float] = []
+    errors: Dict[str, int] = {}
+    writers_done = threading.Event()
+
+    def count_error(error: Exception):
+        kind = "database is locked" if "locked" in str(error) else type(error).__name__
+        with lock:
+            errors[kind] = errors.get(kind, 0) + 1
+
+    def writer(index: int):
+        for transaction in range(args.transactions):
+            jobs = _jobs(index, transaction, args.jobs)
+            started = time.perf_counter()
+            try:
+                with database.SessionLocal() as db:
+                    record_search_run(db, user_ids[index], "Engineer", "Remote", jobs)
+                    db.commit()
+            except SQLAlchemyError as e:
+                count_error(e)
+                continue
+            with lock:
+                commit_seconds.append(time.perf_counter() - started)
+
+    def reader(index: int):
+        user_id = user_ids[index % len(user_ids)]
+        while not writers_done.is_set():
+            started = time.perf_counter()
+            try:
+                with database.SessionLocal() as db:
+                    get_user_job_history(db, user_id, limit=20)
+            except SQLAlchemyError as e:
+                count_error(e)
+            else:
+                with lock:
+                    read_seconds.append(time.perf_counter() - started)
+            writers_done.wait(args.read_interval_ms / 1000)
+
+    readers = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    writers = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    started = time.perf_counter()
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    wall = time.perf_counter() - started
+    writers_done.set()
+    for thread in readers:
+        thread.join()
+
+    return {
+        "wall_seconds": round(wall, 2),
+        "commits": len(commit_seconds),
+        "commits_per_second": round(len(commit_seconds) / wall, 1),
+        "commit": _latency_summary(commit_seconds),
+        "reads": len(read_seconds),
+        "reads_per_second": round(len(read_seconds) / wall, 1),
+        "read": _latency_summary(read_seconds),
+        "errors": errors,
+    }
+
+def run_config(name: str, args) -> Dict[str, Any]:
+    """Run one configuration in a fresh process and return its results"""
+    workdir = tempfile.mkdtemp(prefix=f"spinabot-dbw-{name}-")
+    env = dict(os.environ)
+    env["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    env.update(CONFIGS[name])
+    env.update(dict(setting.split("=", 1) for setting in args.env))
+    command = [
+        sys.executable, "-m", f"{PACKAGE}.benchmarks.db_writes", "--worker",
+        "--writers", str(args.writers), "--readers", str(args.readers),
+        "--transactions", str(args.transactions), "--jobs", str(args.jobs), "--read-interval-ms", str(args.read_interval_ms),
+    ]
+    output = subprocess.run(command, cwd=PACKAGE_PARENT, env=env, capture_output=True, text=True)
+    if output.returncode != 0:
+        raise RuntimeError(f"{name} run failed:\n{output.stderr[-4000:]}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def print_report(results: Dict[str, Dict[str, Any]]):
+    header = f"{'config':<10}{'commits/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'reads/s':>10}{'read p95':>10}  errors"
+    print(header)
+    for name, r in results.items():
+        print(
+            f"{name:<10}{r['commits_per_second']:>11}{r['commit']['p50_ms']!s:>9}{r['commit']['p95_ms']!s:>9}"
+            f"{r['commit']['p99_ms']!s:>9}{r['reads_per_second']:>10}{r['read']['p95_ms']!s:>10}  {r['errors'] or '-'}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure concurrent write throughput before and after the database tuning")
+    parser.add_argument("--config", action="append", choices=list(CONFIGS), help="Configuration to run (repeatable; default all)")
+    parser.add_argument("--writers", type=int, default=16, help="Threads storing search results")
+    parser.add_argument("--readers", type=int, default=8, help="Threads reading job history meanwhile")
+    parser.add_argument("--read-interval-ms", type=float, default=20, help="Pause between one reader's requests")
+    parser.add_argument("--transactions", type=int, default=50, help="Searches stored per writer")
+    parser.add_argument("--jobs", type=int, default=20, help="Listings per search")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per configuration; the median is reported")
+    parser.add_argument("--database-url", help="Default: a fresh SQLite file per configuration")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE", help="Extra setting for every run")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args)))
+        return
+
+    results = {}
+    for name in args.config or list(CONFIGS):
+        runs = sorted((run_config(name, args) for _ in range(args.repeat)), key=lambda r: r["commits_per_second"])
+        # The median run by commit throughput; single runs on a shared machine are noisy
+        results[name] = runs[len(runs) // 2]
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
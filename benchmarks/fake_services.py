@@ -0,0 +1,302 @@
+"""
+Local stand-ins for the Gemini and Twilio HTTP APIs, so load tests never reach
+(or pay for) the real services. Point the app at them with GEMINI_BASE_URL and
+TWILIO_BASE_URL. Both take a latency distribution and an injected failure rate.
+
+    python -m backend.benchmarks.fake_services --gemini-latency lognormal:1200,0.4 --gemini-error-rate 0.02
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from ..simple_server import generate_realistic_jobs
+
+_PROMPT_SEARCH = re.compile(r"Find up to \d+ job openings for '(.*?)' in '(.*?)'\.")
+_PROMPT_SKILLS = re.compile(r"Focus on jobs that require these skills: (.*?)(?= Prioritize | Match jobs | Return results )")
+_PROMPT_COMPANIES = re.compile(r"Prioritize these companies: (.*?)(?= Match jobs | Return results )")
+
+
+class LatencyModel:
+    """Response delay from a spec: "constant:<ms>", "uniform:<min ms>,<max ms>" or "lognormal:<median ms>,<sigma>" """
+
+    def __init__(self, spec: str = "constant:0"):
+        kind, _, args = spec.partition(":")
+        params = [float(arg) for arg in args.split(",") if arg]
+        expected = {"constant": 1, "uniform": 2, "lognormal": 2}
+        if kind not in expected or len(params) != expected[kind]:
+            raise ValueError(f"Invalid latency spec: {spec!r}")
+        self.spec = spec
+        self.kind = kind
+        self.params = params
+
+    def sample(self) -> float:
+        """One delay in seconds"""
+        if self.kind == "constant":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = random.uniform(*self.params)
+        else:
+            median, sigma = self.params
+            ms = median * math.exp(random.gauss(0, sigma))
+        return max(ms, 0) / 1000
+
+
+class ServiceStats:
+    """Request, failure and delay counters for one stand-in"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts: Dict[str, int] = {}
+            self.delays: List[float] = []
+
+    def record(self, outcome: str, delay: float):
+        with self._lock:
+            self.counts[outcome] = self.counts.get(outcome, 0) + 1
+            self.delays.append(delay)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            delays = sorted(self.delays)
+            counts = dict(self.counts)
+
+        def percentile(p):
+            return round(delays[min(int(p / 100 * len(delays)), len(delays) - 1)] * 1000, 1) if delays else None
+
+        return {
+            "requests": sum(counts.values()),
+            **counts,
+            "delay_p50_ms": percentile(50),
+            "delay_p95_ms": percentile(95),
+            "delay_p99_ms": percentile(99),
+        }
+
+
+class FakeService:
+    """A threaded HTTP server on localhost; port 0 picks a free port"""
+
+    handler_class = BaseHTTPRequestHandler
+
+    def __init__(self, latency: LatencyModel, error_rate: float = 0.0, port: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.stats = ServiceStats()
+        handler = type(self.handler_class.__name__, (self.handler_class,), {"service": self})
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeService":
+        self._thread = threading.Thread(target=self.server.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service: FakeService
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _send_json(self, status: int, payload: Any):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _GeminiHandler(_Handler):
+    def do_POST(self):
+        service: FakeGemini = self.service
+        match = re.match(r"^/v1beta/models/([^/:]+):(generateContent|streamGenerateContent)", self.path)
+        if not match:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+            return
+        request = json.loads(self._read_body() or b"{}")
+        prompt = " ".join(
+            part.get("text", "") for content in request.get("contents", []) for part in content.get("parts", [])
+        )
+        delay = service.latency.sample()
+        time.sleep(delay)
+
+        if service.should_fail():
+            service.stats.record("errors", delay)
+            self._send_json(503, {"error": {"code": 503, "message": "Injected failure", "status": "UNAVAILABLE"}})
+            return
+
+        text = json.dumps(service.jobs_for_prompt(prompt))
+        outcome = "ok"
+        if service.malformed_rate > 0 and random.random() < service.malformed_rate:
+            # Cut the JSON mid-object, as a model that hits its output limit does
+            text = text[: len(text) // 2]
+            outcome = "malformed"
+        service.stats.record(outcome, delay)
+
+        if match.group(2) == "generateContent":
+            self._send_json(200, _gemini_response(match.group(1), text))
+            return
+        # Server-sent events; the connection closing ends the stream
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        chunk_size = max(len(text) // service.stream_chunks, 1)
+        for start in range(0, len(text), chunk_size):
+            if start:
+                time.sleep(service.stream_chunk_delay)
+            event = json.dumps(_gemini_response(match.group(1), text[start:start + chunk_size]))
+            self.wfile.write(f"data: {event}\r\n\r\n".encode("utf-8"))
+            self.wfile.flush()
+
+def _gemini_response(model: str, text: str) -> Dict[str, Any]:
+    return {
+        "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}],
+        "modelVersion": model,
+    }
+
+
+class FakeGemini(FakeService):
+    """
+    generateContent and streamGenerateContent. Jobs come from a canned list when
+    given, otherwise from simple_server.generate_realistic_jobs for the search
+    in the prompt. Failures are 503s; malformed responses are truncated JSON.
+    """
+
+    handler_class = _GeminiHandler
+
+    def __init__(
+        self,
+        latency: LatencyModel,
+        error_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        canned_jobs: Optional[List[Dict[str, Any]]] = None,
+        stream_chunks: int = 20,
+        stream_chunk_delay_ms: float = 20,
+        port: int = 0
+    ):
+        super().__init__(latency, error_rate, port)
+        self.malformed_rate = malformed_rate
+        self.canned_jobs = canned_jobs
+        self.stream_chunks = max(stream_chunks, 1)
+        self.stream_chunk_delay = stream_chunk_delay_ms / 1000
+
+    def jobs_for_prompt(self, prompt: str) -> List[Dict[str, Any]]:
+        if self.canned_jobs is not None:
+            return self.canned_jobs
+        search = _PROMPT_SEARCH.search(prompt)
+        job_title, location = search.groups() if search else ("Software Engineer", "Remote")
+        skills = _PROMPT_SKILLS.search(prompt)
+        companies = _PROMPT_COMPANIES.search(prompt)
+        jobs = generate_realistic_jobs(
+            job_title,
+            location,
+            skills.group(1).split(", ") if skills else [],
+            companies.group(1).split(", ") if companies else []
+        )
+        # Only the keys the prompt asks the model for
+        for job in jobs:
+            job.pop("search_timestamp", None)
+            job.pop("skills_required", None)
+        return jobs
+
+
+class _TwilioHandler(_Handler):
+    def do_POST(self):
+        service: FakeTwilio = self.service
+        match = re.match(r"^/2010-04-01/Accounts/([^/]+)/Messages\.json$", self.path)
+        if not match:
+            self._send_json(404, {"code": 20404, "message": "Not found", "status": 404})
+            return
+        form = {key: values[0] for key, values in parse_qs(self._read_body().decode("utf-8")).items()}
+        delay = service.latency.sample()
+        time.sleep(delay)
+
+        if service.should_fail():
+            service.stats.record("errors", delay)
+            self._send_json(429, {"code": 20429, "message": "Injected failure", "status": 429})
+            return
+
+        service.stats.record("ok", delay)
+        now = datetime.now(timezone.utc).strftime("%a, %d %b %Y %H:%M:%S +0000")
+        self._send_json(201, {
+            "sid": "SM" + uuid.uuid4().hex,
+            "account_sid": match.group(1),
+            "to": form.get("To"),
+            "from": form.get("From"),
+            "body": form.get("Body"),
+            "status": "queued",
+            "num_segments": "1",
+            "direction": "outbound-api",
+            "api_version": "2010-04-01",
+            "date_created": now,
+            "date_updated": now,
+        })
+
+
+class FakeTwilio(FakeService):
+    """The Messages resource of the Twilio REST API. Failures are 429s"""
+
+    handler_class = _TwilioHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run local Gemini and Twilio stand-ins")
+    parser.add_argument("--gemini-port", type=int, default=9001)
+    parser.add_argument("--twilio-port", type=int, default=9002)
+    parser.add_argument("--gemini-latency", default="lognormal:1500,0.4")
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-malformed-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-jobs-file", help="JSON array of jobs to return for every search")
+    parser.add_argument("--twilio-latency", default="lognormal:150,0.3")
+    parser.add_argument("--twilio-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    canned_jobs = None
+    if args.gemini_jobs_file:
+        with open(args.gemini_jobs_file, encoding="utf-8") as f:
+            canned_jobs = json.load(f)
+    gemini = FakeGemini(
+        LatencyModel(args.gemini_latency), args.gemini_error_rate, args.gemini_malformed_rate,
+        canned_jobs=canned_jobs, port=args.gemini_port
+    ).start()
+    twilio = FakeTwilio(LatencyModel(args.twilio_latency), args.twilio_error_rate, port=args.twilio_port).start()
+    print(f"GEMINI_BASE_URL={gemini.url}")
+    print(f"TWILIO_BASE_URL={twilio.url}")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"gemini: {gemini.stats.snapshot()}  twilio: {twilio.stats.snapshot()}")
+    except KeyboardInterrupt:
+        gemini.stop()
+        twilio.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+"""
+Offline load test for the API. Starts the Gemini and Twilio stand-ins, runs the
+app under uvicorn on a scratch SQLite database pointed at them, drives scripted
+scenarios and reports throughput and p50/p95/p99 latency for every stage, next
+to what the stand-ins saw. With --baseline, a stage whose p95 or throughput got
+worse by more than --max-regression fails the run.
+
+    python -m backend.benchmarks.run --users 200 --concurrency 50
+    python -m backend.benchmarks.run --scenario search_burst --json after.json --baseline before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from .fake_services import FakeGemini, FakeTwilio, LatencyModel
+
+SCENARIOS = ("signup_login", "resume_uploads", "search_burst", "history_reads")
+
+SEARCH_TITLES = [
+    "Software Engineer", "Data Scientist", "Product Manager", "DevOps", "Designer",
+    "Backend Engineer", "Frontend Engineer", "Machine Learning Engineer", "Data Engineer", "QA Engineer",
+]
+SEARCH_LOCATIONS = ["Remote", "New York", "San Francisco", "Bangalore", "London", "Berlin", "Toronto", "Singapore"]
+SKILLS = ["Python", "SQL", "Kubernetes", "React", "AWS", "Go", "Java", "Docker", "TypeScript", "Spark"]
+COMPANIES = ["Google", "Stripe", "Databricks", "Netflix", "Spotify", "NVIDIA"]
+
+
+class StageTimings:
+    """Latency samples and error counts per stage of one scenario"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+
+    def record(self, stage: str, seconds: float, ok: bool = True):
+        self.samples.setdefault(stage, []).append(seconds)
+        if not ok:
+            self.errors[stage] = self.errors.get(stage, 0) + 1
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def summary(self, wall_seconds: float) -> Dict[str, Dict[str, Any]]:
+        stages = {}
+        for stage, samples in self.samples.items():
+            ms = np.asarray(samples) * 1000
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            stages[stage] = {
+                "count": len(samples),
+                "errors": self.errors.get(stage, 0),
+                "throughput_rps": round(len(samples) / wall_seconds, 2) if wall_seconds else None,
+                "p50_ms": round(float(p50), 1),
+                "p95_ms": round(float(p95), 1),
+                "p99_ms": round(float(p99), 1),
+                "max_ms": round(float(ms.max()), 1),
+            }
+        return stages
+
+
+class LoadClient:
+    """HTTP client with a cap on requests in flight; every request is timed under a stage"""
+
+    def __init__(self, base_url: str, concurrency: int):
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(120),
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        )
+        self.slots = asyncio.Semaphore(concurrency)
+
+    async def request(self, timings: StageTimings, stage: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        async with self.slots:
+            start = time.perf_counter()
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.HTTPError:
+                timings.record(stage, time.perf_counter() - start, ok=False)
+                return None
+            timings.record(stage, time.perf_counter() - start, ok=response.status_code < 400)
+            return response
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def make_resume_pdf(name: str, skills: List[str]) -> bytes:
+    """A small single-page text PDF that the resume parser can extract"""
+    lines = [name, "Senior engineer with eight years of experience", "Skills: " + ", ".join(skills)]
+    text = " ".join(f"({line}) Tj 0 -16 Td" for line in lines)
+    content = f"BT /F1 12 Tf 72 720 Td {text} ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [4 0 R] /Count 1 >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents 5 0 R >>",
+        f"<< /Length {len(content)} >>\nstream\n{content}\nendstream",
+    ]
+    out = "%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n" + "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    return out.encode("latin-1")
+
+def search_queries(distinct: int) -> List[Dict[str, str]]:
+    pairs = [(title, location) for location in SEARCH_LOCATIONS for title in SEARCH_TITLES]
+    return [{"job_title": title, "location": location} for title, location in pairs[:max(distinct, 1)]]
+
+
+async def signup_login(load: LoadClient, timings: StageTimings, users: int, run_id: str) -> List[Dict[str, Any]]:
+    """Every user signs up and logs in at once"""
+    async def one(i):
+        email = f"bench-{run_id}-{i}@example.com"
+        await load.request(timings, "signup", "POST", "/signup", json={"name": f"Bench User {i}", "email": email, "password": "benchmark"})
+        response = await load.request(timings, "login", "POST", "/login", json={"email": email, "password": "benchmark"})
+        if response is None or response.status_code != 200:
+            return None
+        return {"index": i, "email": email, "headers": {"Authorization": f"Bearer {response.json()['access_token']}"}}
+
+    return [user for user in await asyncio.gather(*(one(i) for i in range(users))) if user]
+
+async def save_preferences(load: LoadClient, timings: StageTimings, users: List[Dict[str, Any]], with_resume: bool, poll_timeout: float = 120):
+    """Every user saves preferences; with resumes, also times upload-to-parsed through the job queue"""
+    async def one(user):
+        rng = random.Random(user["index"])
+        skills = rng.sample(SKILLS, 3)
+        data = {
+            "job_title": SEARCH_TITLES[user["index"] % len(SEARCH_TITLES)],
+            "location": SEARCH_LOCATIONS[user["index"] % len(SEARCH_LOCATIONS)],
+            "skills": ",".join(skills),
+            "preferred_companies": ",".join(rng.sample(COMPANIES, 2)),
+            "whatsapp_number": f"+1555{user['index']:07d}",
+        }
+        files = {"resume": ("resume.pdf", make_resume_pdf(user["email"], skills), "application/pdf")} if with_resume else None
+        start = time.perf_counter()
+        response = await load.request(timings, "save_preferences", "POST", "/save-preferences", headers=user["headers"], data=data, files=files)
+        job_id = response.json().get("resume_job_id") if response is not None and response.status_code == 200 else None
+        if not job_id:
+            return
+        # Polls are not load, so they bypass the concurrency cap and are not timed themselves
+        while time.perf_counter() - start < poll_timeout:
+            await asyncio.sleep(0.1)
+            status = (await load.client.get(f"/resume-jobs/{job_id}", headers=user["headers"])).json()["job"]["status"]
+            if status in ("done", "failed"):
+                timings.record("resume_parsed", time.perf_counter() - start, ok=status == "done")
+                return
+        timings.record("resume_parsed", time.perf_counter() - start, ok=False)
+
+    await asyncio.gather(*(one(user) for user in users))
+
+async def search_burst(
+    load: LoadClient,
+    timings: StageTimings,
+    users: List[Dict[str, Any]],
+    searches: int,
+    distinct_queries: int,
+    stream_ratio: float
+):
+    """Many searches at once over a fixed set of queries, so caching and coalescing are exercised"""
+    queries = search_queries(distinct_queries)
+
+    async def one(k):
+        user = users[k % len(users)]
+        query = queries[k % len(queries)]
+        if random.random() >= stream_ratio:
+            response = await load.request(timings, "search", "POST", "/search-jobs", headers=user["headers"], json=query)
+            if response is not None and response.status_code == 200 and not response.json().get("total_jobs"):
+                timings.count("search_empty")
+            return
+        async with load.slots:
+            start = time.perf_counter()
+            first = None
+            ok = False
+            try:
+                async with load.client.stream("POST", "/search-jobs/stream", headers=user["headers"], json=query) as response:
+                    async for line in response.aiter_lines():
+                        event = json.loads(line) if line else {}
+                        if event.get("type") == "job" and first is None:
+                            first = time.perf_counter() - start
+                        ok = event.get("type") == "done" or ok
+            except httpx.HTTPError:
+                pass
+            timings.record("search_stream", time.perf_counter() - start, ok=ok)
+            if first is not None:
+                timings.record("search_stream_first_job", first)
+
+    await asyncio.gather(*(one(k) for k in range(searches)))
+
+async def history_reads(load: LoadClient, timings: StageTimings, users: List[Dict[str, Any]], page_size: int, max_pages: int):
+    """Every user pages through their job history"""
+    async def one(user):
+        cursor = None
+        for _ in range(max_pages):
+            params = {"limit": page_size, **({"cursor": cursor} if cursor else {})}
+            response = await load.request(timings, "history_page", "GET", "/job-history", headers=user["headers"], params=params)
+            if response is None or response.status_code != 200:
+                return
+            cursor = response.json().get("next_cursor")
+            if not cursor:
+                return
+
+    await asyncio.gather(*(one(user) for user in users))
+
+
+async def run_scenarios(args, base_url: str, gemini: FakeGemini, twilio: FakeTwilio) -> Dict[str, Any]:
+    load = LoadClient(base_url, args.concurrency)
+    run_id = uuid.uuid4().hex[:8]
+    results = {}
+    users: List[Dict[str, Any]] = []
+
+    async def scenario(name, coro_fn):
+        gemini.stats.reset()
+        twilio.stats.reset()
+        timings = StageTimings()
+        start = time.perf_counter()
+        value = await coro_fn(timings)
+        wall = time.perf_counter() - start
+        if name in args.scenario:
+            results[name] = {
+                "wall_seconds": round(wall, 2),
+                "stages": timings.summary(wall),
+                "counters": timings.counters,
+                "gemini": gemini.stats.snapshot(),
+                "twilio": twilio.stats.snapshot(),
+            }
+        return value
+
+    try:
+        # Later scenarios need signed-in users with preferences, so setup runs even when not reported
+        users = await scenario("signup_login", lambda t: signup_login(load, t, args.users, run_id))
+        if not users:
+            raise RuntimeError("No users could sign up; see the server log")
+        await scenario(
+            "resume_uploads" if "resume_uploads" in args.scenario else "preferences",
+            lambda t: save_preferences(load, t, users, with_resume="resume_uploads" in args.scenario)
+        )
+        if "search_burst" in args.scenario or "history_reads" in args.scenario:
+            await scenario(
+                "search_burst",
+                lambda t: search_burst(load, t, users, args.searches, args.distinct_queries, args.stream_ratio)
+            )
+        if "history_reads" in args.scenario:
+            await scenario("history_reads", lambda t: history_reads(load, t, users, args.history_page_size, args.history_pages))
+    finally:
+        await load.close()
+    return results
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_api(args, gemini: FakeGemini, twilio: FakeTwilio, workdir: str) -> subprocess.Popen:
+    """Run the app under uvicorn, configured for the stand-ins and a scratch database"""
+    package = __package__.rsplit(".", 1)[0]
+    package_parent = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "GOOGLE_API_KEY": "benchmark",
+        "GEMINI_BASE_URL": gemini.url,
+        "TWILIO_BASE_URL": twilio.url,
+        "TWILIO_ACCOUNT_SID": "ACbenchmark",
+        "TWILIO_AUTH_TOKEN": "benchmark",
+        "TWILIO_WHATSAPP_FROM": "whatsapp:+15550000000",
+        "NOTIFICATION_WORKER_ENABLED": "True",
+        "WHATSAPP_MAX_SENDS_PER_SECOND": "1000",
+        "ALERT_SCHEDULER_ENABLED": "False",
+        "RESUME_STORE_PATH": os.path.join(workdir, "resume_store"),
+        "RESUME_CACHE_PATH": os.path.join(workdir, "resume_cache.db"),
+        "SEARCH_CACHE_PATH": os.path.join(workdir, "search_cache.db"),
+    })
+    env.update(dict(setting.split("=", 1) for setting in args.env))
+    log = open(os.path.join(workdir, "server.log"), "wb")
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", f"{package}.main:app",
+            "--host", "127.0.0.1", "--port", str(args.port), "--workers", str(args.workers), "--log-level", "warning",
+        ],
+        cwd=package_parent, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    deadline = time.monotonic() + args.startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API exited with {process.returncode}; see {log.name}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{args.port}/", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"API did not start within {args.startup_timeout}s; see {log.name}")
+
+def print_report(results: Dict[str, Any]):
+    header = f"{'stage':<26}{'count':>7}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    for name, result in results.items():
+        print(f"\n== {name} ({result['wall_seconds']}s) ==")
+        print(header)
+        for stage, s in result["stages"].items():
+            print(
+                f"{stage:<26}{s['count']:>7}{s['errors']:>8}{s['throughput_rps']:>9}"
+                f"{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}{s['max_ms']:>10}"
+            )
+        if result["counters"]:
+            print(f"counters: {result['counters']}")
+        print(f"gemini: {result['gemini']}")
+        print(f"twilio: {result['twilio']}")
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Stages whose p95 rose, or throughput fell, by more than max_regression"""
+    regressions = []
+    for name, result in results.items():
+        for stage, current in result["stages"].items():
+            previous = baseline.get("scenarios", {}).get(name, {}).get("stages", {}).get(stage)
+            if not previous:
+                continue
+            if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + max_regression):
+                regressions.append(f"{name}/{stage}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+            if previous["throughput_rps"] and current["throughput_rps"] < previous["throughput_rps"] * (1 - max_regression):
+                regressions.append(f"{name}/{stage}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} req/s")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the API against local Gemini and Twilio stand-ins")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="Scenario to report (repeatable; default all)")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50, help="Requests in flight at once")
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--distinct-queries", type=int, default=20, help="Fewer distinct queries means more cache hits")
+    parser.add_argument("--stream-ratio", type=float, default=0.2, help="Share of searches made through /search-jobs/stream")
+    parser.add_argument("--history-page-size", type=int, default=20)
+    parser.add_argument("--history-pages", type=int, default=5)
+    parser.add_argument("--gemini-latency", default="lognormal:1500,0.4", help='e.g. "constant:800", "uniform:200,1500"')
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-malformed-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-jobs-file", help="JSON array of jobs to return for every search")
+    parser.add_argument("--twilio-latency", default="lognormal:150,0.3")
+    parser.add_argument("--twilio-error-rate", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=0, help="API port (default: a free one)")
+    parser.add_argument("--database-url", help="Default: SQLite in a scratch directory")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE", help="Extra setting for the API process")
+    parser.add_argument("--startup-timeout", type=float, default=60)
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Results JSON from an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+    args.scenario = args.scenario or list(SCENARIOS)
+    args.port = args.port or _free_port()
+
+    canned_jobs = None
+    if args.gemini_jobs_file:
+        with open(args.gemini_jobs_file, encoding="utf-8") as f:
+            canned_jobs = json.load(f)
+    gemini = FakeGemini(
+        LatencyModel(args.gemini_latency), args.gemini_error_rate, args.gemini_malformed_rate, canned_jobs=canned_jobs
+    ).start()
+    twilio = FakeTwilio(LatencyModel(args.twilio_latency), args.twilio_error_rate).start()
+    workdir = tempfile.mkdtemp(prefix="spinabot-bench-")
+    print(f"Scratch directory: {workdir}")
+
+    api = start_api(args, gemini, twilio, workdir)
+    try:
+        results = asyncio.run(run_scenarios(args, f"http://127.0.0.1:{args.port}", gemini, twilio))
+    finally:
+        api.terminate()
+        api.wait(timeout=30)
+        gemini.stop()
+        twilio.stop()
+
+    print_report(results)
+    report = {"config": vars(args), "scenarios": results}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_to_baseline(results, json.load(f), args.max_regression)
+        if regressions:
+            print("\nRegressions against the baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Cold-start benchmark: how long a fresh interpreter takes to import the app, and
+how long a new uvicorn process takes to answer GET / with a 200. Gemini and
+Twilio credentials are left empty, since a pod has to boot without reaching
+either service. Fails when the median time to the first response is over budget.
+
+    python -m backend.benchmarks.startup --runs 5 --budget-seconds 3
+    python -m backend.benchmarks.startup --importtime 15
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", 3.0))
+
+PACKAGE = __package__.rsplit(".", 1)[0]
+PACKAGE_PARENT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _api_env(workdir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'startup.db')}",
+        "GOOGLE_API_KEY": "",
+        "TWILIO_ACCOUNT_SID": "",
+        "TWILIO_AUTH_TOKEN": "",
+        "RESUME_STORE_PATH": os.path.join(workdir, "resume_store"),
+        "RESUME_CACHE_PATH": os.path.join(workdir, "resume_cache.db"),
+        "SEARCH_CACHE_PATH": os.path.join(workdir, "search_cache.db"),
+    })
+    return env
+
+def measure_import(env: Dict[str, str]) -> float:
+    """Seconds to import the app module in a fresh interpreter"""
+    code = f"import time; t = time.perf_counter(); import {PACKAGE}.main; print(time.perf_counter() - t)"
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=PACKAGE_PARENT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+def measure_first_response(env: Dict[str, str], timeout: float) -> float:
+    """Seconds from launching uvicorn until GET / returns 200"""
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{PACKAGE}.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=PACKAGE_PARENT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"API exited with {process.returncode}: {process.stderr.read().decode(errors='replace')[-2000:]}")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError(f"API did not answer within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+def slowest_imports(env: Dict[str, str], limit: int) -> List[str]:
+    """The modules with the largest cumulative import time, from python -X importtime"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {PACKAGE}.main"],
+        cwd=PACKAGE_PARENT, env=env, capture_output=True, text=True, check=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.rstrip()))
+    rows.sort(reverse=True)
+    return [f"{cumulative / 1000:8.1f} ms  {name}" for cumulative, name in rows[:limit]]
+
+def _summary(values: List[float]) -> str:
+    return f"min {min(values):.3f}s  p50 {statistics.median(values):.3f}s  max {max(values):.3f}s"
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how fast a new API process starts serving")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-seconds", type=float, default=STARTUP_BUDGET_SECONDS,
+                        help="Median time to the first 200 on / must stay under this")
+    parser.add_argument("--importtime", type=int, default=0, metavar="N", help="Also list the N slowest imports")
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="spinabot-startup-")
+    env = _api_env(workdir)
+    imports = [measure_import(env) for _ in range(args.runs)]
+    first_responses = [measure_first_response(env, args.timeout) for _ in range(args.runs)]
+
+    print(f"Import {PACKAGE}.main:  {_summary(imports)}")
+    print(f"First 200 on /:  {_summary(first_responses)}")
+    if args.importtime:
+        print("\nSlowest imports (cumulative):")
+        for line in slowest_imports(env, args.importtime):
+            print(f"  {line}")
+
+    median = statistics.median(first_responses)
+    if median > args.budget_seconds:
+        print(f"\nOver budget: {median:.3f}s > {args.budget_seconds:.3f}s")
+        sys.exit(1)
+    print(f"\nWithin budget: {median:.3f}s <= {args.budget_seconds:.3f}s")
+
+if __name__ == "__main__":
+    main()
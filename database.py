@@ -1,14 +1,123 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
+import threading
 from dotenv import load_dotenv
+from typing import Any, Dict, List, Sequence, Union
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./job_agent.db")
+# Create missing tables when the API starts; deployments that run the alembic migrations turn this off
+DB_CREATE_TABLES = os.getenv("DB_CREATE_TABLES", "True").lower() == "true"
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {})
+# Connection pool, per process. pool_size + max_overflow across all workers must stay under the server's max_connections
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+# Reconnect before the server or a proxy drops idle connections
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+
+# SQLite: WAL lets readers run alongside the single writer, and synchronous=NORMAL
+# is safe under WAL (a power loss can drop the last commits, not corrupt the file)
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+# How long a writer waits for the lock before "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+# Queue this process's writers on a lock instead of SQLite's sleep-and-retry busy handler
+SQLITE_SERIALIZE_WRITES = os.getenv("SQLITE_SERIALIZE_WRITES", "True").lower() == "true"
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+    finally:
+        cursor.close()
+
+class _SQLiteWriteQueue:
+    """
+    SQLite takes its write lock at a transaction's first write and holds it until
+    the commit. Taking a process-wide lock at the same point lets the next writer
+    start as soon as the last one commits, where the busy handler would poll with
+    growing sleeps and leave the database idle. Writers in other processes still
+    meet the busy timeout.
+
+    The lock is not reentrant, since a transaction can be committed on another thread
+    than the one that began it. A thread that writes through a second session while
+    its first holds the lock waits out SQLITE_BUSY_TIMEOUT_MS, as SQLite itself would
+    make it; commit or roll back the first session before writing through another.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # id of the DBAPI connection -> True while it holds the lock, False after timing out on it
+        self._holders: Dict[int, bool] = {}
+
+    def before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        key = id(cursor.connection)
+        # Acquired once per transaction, at its first write
+        if key in self._holders or not statement.lstrip()[:7].upper().startswith(("INSERT", "UPDATE", "DELETE", "REPLACE")):
+            return
+        # On timeout the rest of the transaction goes ahead without the lock; SQLite's own busy timeout then applies
+        self._holders[key] = self._lock.acquire(timeout=SQLITE_BUSY_TIMEOUT_MS / 1000)
+
+    def release(self, dbapi_connection):
+        # The dialect is handed the pool's proxy for the connection, pool events the connection itself
+        dbapi_connection = getattr(dbapi_connection, "dbapi_connection", dbapi_connection)
+        if self._holders.pop(id(dbapi_connection), False):
+            self._lock.release()
+
+    def _release_after(self, end_transaction):
+        def wrapper(dbapi_connection):
+            try:
+                end_transaction(dbapi_connection)
+            finally:
+                self.release(dbapi_connection)
+        return wrapper
+
+    def listen(self, engine: Engine):
+        event.listen(engine, "before_cursor_execute", self.before_execute)
+        # The engine's "commit" event fires before the COMMIT runs; release only once SQLite has let go of its lock
+        dialect = engine.dialect
+        dialect.do_commit = self._release_after(dialect.do_commit)
+        dialect.do_rollback = self._release_after(dialect.do_rollback)
+        # A connection invalidated mid-transaction
+        event.listen(engine.pool, "invalidate", lambda dbapi_connection, record, exception: self.release(dbapi_connection))
+
+def create_db_engine(database_url: str = DATABASE_URL) -> Engine:
+    """Engine with the pool settings above, and the pragmas applied to every new SQLite connection"""
+    url = make_url(database_url)
+    kwargs: Dict[str, Any] = {}
+    if url.get_backend_name() == "sqlite":
+        kwargs["connect_args"] = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+    if not _is_memory_sqlite(url):
+        kwargs.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+    engine = create_engine(url, **kwargs)
+    if url.get_backend_name() == "sqlite":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+        if SQLITE_SERIALIZE_WRITES and not _is_memory_sqlite(url):
+            _SQLiteWriteQueue().listen(engine)
+    return engine
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -19,3 +128,32 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def insert_ignoring_conflicts(db, model, rows: List[Dict[str, Any]], key: Union[str, Sequence[str]]) -> List[Dict[str, Any]]:
+    """
+    Insert rows in one statement, skipping any whose unique key (one column or a
+    composite of several) already exists. Runs in the caller's transaction and
+    returns the rows that were actually inserted.
+    """
+    if not rows:
+        return []
+    keys = [key] if isinstance(key, str) else list(key)
+    columns = [getattr(model, name) for name in keys]
+
+    def row_key(row):
+        return tuple(row[name] for name in keys)
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        inserted = {
+            tuple(row) for row in db.execute(
+                insert(model).values(rows).on_conflict_do_nothing(index_elements=keys).returning(*columns)
+            )
+        }
+        return [row for row in rows if row_key(row) in inserted]
+    existing = {tuple(row) for row in db.execute(select(*columns).where(tuple_(*columns).in_([row_key(row) for row in rows])))}
+    new_rows = [row for row in rows if row_key(row) not in existing]
+    if new_rows:
+        db.execute(model.__table__.insert(), new_rows)
+    return new_rows
@@ -0,0 +1,28 @@
+"""Index user_preferences.user_id
+
+Revision ID: e4b753fca9ce
+Revises: 3b960737fbcc
+Create Date: 2026-10-17 18:40:12.730915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b753fca9ce'
+down_revision: Union[str, Sequence[str], None] = '3b960737fbcc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_user_preferences_user_id'), 'user_preferences', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_user_preferences_user_id'), table_name='user_preferences')
@@ -0,0 +1,83 @@
+"""Add content fingerprint to job_listings and remove duplicate postings
+
+Revision ID: e635b1dc11a7
+Revises: bcde59a9a595
+Create Date: 2026-10-17 10:48:55.019386
+
+"""
+from typing import Sequence, Union
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e635b1dc11a7'
+down_revision: Union[str, Sequence[str], None] = 'bcde59a9a595'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+
+def _fingerprint(title, company, location, application_url):
+    # Frozen copy of models.job_fingerprint as of this revision
+    parts = [" ".join(str(value or "").lower().split()) for value in (title, company, location, application_url)]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('job_listings', sa.Column('fingerprint', sa.String(length=64), nullable=True))
+
+    conn = op.get_bind()
+    job_listings = sa.table(
+        'job_listings',
+        sa.column('id', sa.Integer), sa.column('title', sa.String), sa.column('company', sa.String),
+        sa.column('location', sa.String), sa.column('application_url', sa.String),
+        sa.column('fingerprint', sa.String),
+    )
+
+    # Backfill in id order, keeping the oldest row of each posting and collecting the rest
+    seen = set()
+    duplicate_ids = []
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(job_listings.c.id, job_listings.c.title, job_listings.c.company,
+                      job_listings.c.location, job_listings.c.application_url)
+            .where(job_listings.c.id > last_id)
+            .order_by(job_listings.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        updates = []
+        for row in rows:
+            fingerprint = _fingerprint(row.title, row.company, row.location, row.application_url)
+            if fingerprint in seen:
+                duplicate_ids.append(row.id)
+            else:
+                seen.add(fingerprint)
+                updates.append({'row_id': row.id, 'fp': fingerprint})
+        if updates:
+            conn.execute(
+                job_listings.update().where(job_listings.c.id == sa.bindparam('row_id')).values(fingerprint=sa.bindparam('fp')),
+                updates
+            )
+        last_id = rows[-1].id
+
+    for start in range(0, len(duplicate_ids), BATCH_SIZE):
+        conn.execute(job_listings.delete().where(job_listings.c.id.in_(duplicate_ids[start:start + BATCH_SIZE])))
+
+    with op.batch_alter_table('job_listings') as batch_op:
+        batch_op.alter_column('fingerprint', existing_type=sa.String(length=64), nullable=False)
+        batch_op.create_index(batch_op.f('ix_job_listings_fingerprint'), ['fingerprint'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('job_listings') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_job_listings_fingerprint'))
+        batch_op.drop_column('fingerprint')
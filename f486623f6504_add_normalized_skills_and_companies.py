@@ -0,0 +1,121 @@
+"""Add normalized skills and companies tables for user preferences
+
+Revision ID: f486623f6504
+Revises: 71c067c8de95
+Create Date: 2026-10-17 15:08:52.264917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f486623f6504'
+down_revision: Union[str, Sequence[str], None] = '71c067c8de95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+
+def _terms(value):
+    # Lowercase and collapse whitespace; skill aliases are applied the next time a user saves
+    terms = {" ".join(part.lower().split())[:100] for part in (value or "").split(",")}
+    terms.discard("")
+    return terms
+
+
+def _name_ids(conn, table, names):
+    existing = dict(conn.execute(sa.select(table.c.name, table.c.id)).fetchall())
+    missing = sorted(set(names) - set(existing))
+    for start in range(0, len(missing), BATCH_SIZE):
+        conn.execute(table.insert(), [{'name': name} for name in missing[start:start + BATCH_SIZE]])
+    return dict(conn.execute(sa.select(table.c.name, table.c.id)).fetchall())
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('skills',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_skills_id'), 'skills', ['id'], unique=False)
+    op.create_index(op.f('ix_skills_name'), 'skills', ['name'], unique=True)
+    op.create_table('companies',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_companies_id'), 'companies', ['id'], unique=False)
+    op.create_index(op.f('ix_companies_name'), 'companies', ['name'], unique=True)
+    op.create_table('user_preference_skills',
+        sa.Column('preference_id', sa.Integer(), nullable=False),
+        sa.Column('skill_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('preference_id', 'skill_id')
+    )
+    op.create_index('ix_user_preference_skills_skill_user', 'user_preference_skills', ['skill_id', 'user_id'], unique=False)
+    op.create_table('user_preference_companies',
+        sa.Column('preference_id', sa.Integer(), nullable=False),
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('preference_id', 'company_id')
+    )
+    op.create_index('ix_user_preference_companies_company_user', 'user_preference_companies', ['company_id', 'user_id'], unique=False)
+
+    conn = op.get_bind()
+    user_preferences = sa.table(
+        'user_preferences',
+        sa.column('id', sa.Integer), sa.column('user_id', sa.Integer),
+        sa.column('skills', sa.Text), sa.column('preferred_companies', sa.Text),
+    )
+    skills = sa.table('skills', sa.column('id', sa.Integer), sa.column('name', sa.String))
+    companies = sa.table('companies', sa.column('id', sa.Integer), sa.column('name', sa.String))
+    preference_skills = sa.table(
+        'user_preference_skills',
+        sa.column('preference_id', sa.Integer), sa.column('skill_id', sa.Integer), sa.column('user_id', sa.Integer),
+    )
+    preference_companies = sa.table(
+        'user_preference_companies',
+        sa.column('preference_id', sa.Integer), sa.column('company_id', sa.Integer), sa.column('user_id', sa.Integer),
+    )
+
+    rows = [
+        (row.id, row.user_id, _terms(row.skills), _terms(row.preferred_companies))
+        for row in conn.execute(sa.select(
+            user_preferences.c.id, user_preferences.c.user_id,
+            user_preferences.c.skills, user_preferences.c.preferred_companies
+        ))
+    ]
+    skill_ids = _name_ids(conn, skills, {name for row in rows for name in row[2]})
+    company_ids = _name_ids(conn, companies, {name for row in rows for name in row[3]})
+
+    skill_links = [
+        {'preference_id': pref_id, 'skill_id': skill_ids[name], 'user_id': user_id}
+        for pref_id, user_id, names, _ in rows for name in names
+    ]
+    company_links = [
+        {'preference_id': pref_id, 'company_id': company_ids[name], 'user_id': user_id}
+        for pref_id, user_id, _, names in rows for name in names
+    ]
+    for start in range(0, len(skill_links), BATCH_SIZE):
+        conn.execute(preference_skills.insert(), skill_links[start:start + BATCH_SIZE])
+    for start in range(0, len(company_links), BATCH_SIZE):
+        conn.execute(preference_companies.insert(), company_links[start:start + BATCH_SIZE])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_preference_companies_company_user', table_name='user_preference_companies')
+    op.drop_table('user_preference_companies')
+    op.drop_index('ix_user_preference_skills_skill_user', table_name='user_preference_skills')
+    op.drop_table('user_preference_skills')
+    op.drop_index(op.f('ix_companies_name'), table_name='companies')
+    op.drop_index(op.f('ix_companies_id'), table_name='companies')
+    op.drop_table('companies')
+    op.drop_index(op.f('ix_skills_name'), table_name='skills')
+    op.drop_index(op.f('ix_skills_id'), table_name='skills')
+    op.drop_table('skills')
@@ -1,11 +1,169 @@
-from google import genai
-import json
-import re
-from typing import List, Dict, Any
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import contextlib
+import copy
+import os
+import threading
+import weakref
+from typing import List, Dict, Any, AsyncIterator, Callable
+from .metrics import span
+from .search_cache import CacheStats, get_search_cache, make_search_key
+from .stream_parser import JobStreamParser, parse_job_objects
+from .skill_extractor import tag_job_skills
 
-client = genai.Client()
+# Another endpoint for the Gemini API, e.g. the stand-in in benchmarks/fake_services.py
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
 
-def search_jobs_gemini(
+_client = None
+_client_lock = threading.Lock()
+
+def get_gemini_client():
+    """
+    Shared Gemini client for this process, created on first use. The SDK is only
+    imported here, so starting a worker does not pay for it and a missing API key
+    fails the first model call instead of the import.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from google import genai
+                _client = genai.Client(http_options={"base_url": GEMINI_BASE_URL} if GEMINI_BASE_URL else None)
+    return _client
+
+GEMINI_MODEL = "gemini-2.5-flash"
+MAX_JOBS = 20
+
+# Upper bound on model calls awaiting a response per event loop (async path only)
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", 200))
+# asyncio primitives only work on the loop that first used them, and the workers'
+# CLIs start a new loop per asyncio.run, so each running loop gets its own
+_gemini_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+# Only the start of the resume is sent to the model, so only that part affects results
+RESUME_PROMPT_CHARS = 500
+
+
+def _gemini_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _gemini_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _gemini_semaphores[loop] = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+    return semaphore
+
+
+class GeminiUnavailable(Exception):
+    """The model call failed (outage, rate limit, bad key), as opposed to finding no jobs"""
+
+
+class _InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into a single execution.
+    Threads that arrive while a call is in flight wait for it and share its result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _InFlightCall] = {}
+        self.stats = CacheStats()
+
+    def do(self, key: str, fn: Callable, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _InFlightCall()
+                self._calls[key] = call
+        
+        if not is_leader:
+            self.stats.incr("hits")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+        
+        self.stats.incr("misses")
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """
+    Asyncio counterpart of SingleFlight. Followers await the leader's task without
+    taking a worker thread, and the shared task survives a cancelled leader request.
+    Calls are only coalesced within one event loop, since a task can't be awaited from another.
+    """
+
+    def __init__(self):
+        self._tasks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]" = weakref.WeakKeyDictionary()
+        self.stats = CacheStats()
+
+    async def do(self, key: str, coro_fn: Callable, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        tasks = self._tasks.get(loop)
+        if tasks is None:
+            tasks = self._tasks[loop] = {}
+        task = tasks.get(key)
+        if task is None:
+            self.stats.incr("misses")
+            task = asyncio.ensure_future(coro_fn(*args, **kwargs))
+            tasks[key] = task
+            task.add_done_callback(lambda t: self._forget(tasks, key, t))
+            return await asyncio.shield(task)
+        
+        self.stats.incr("hits")
+        result = await asyncio.shield(task)
+        return copy.deepcopy(result)
+
+    def _forget(self, tasks: Dict[str, asyncio.Task], key: str, task: asyncio.Task):
+        if tasks.get(key) is task:
+            del tasks[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved when no request is left to await it
+            task.exception()
+
+_search_flight = SingleFlight()
+_async_search_flight = AsyncSingleFlight()
+
+def single_flight_stats() -> Dict[str, Any]:
+    """Counters for coalesced searches: leaders ran the call, coalesced shared a leader's result"""
+    stats = {}
+    for name, flight in (("threads", _search_flight), ("asyncio", _async_search_flight)):
+        counters = flight.stats.as_dict()
+        stats[name] = {"leaders": counters["misses"], "coalesced": counters["hits"]}
+    return stats
+
+def _search_key(
+    job_title: str,
+    location: str,
+    skills: List[str] = None,
+    preferred_companies: List[str] = None,
+    resume_content: str = None
+) -> str:
+    return make_search_key(
+        job_title=job_title,
+        location=location,
+        skills=skills,
+        preferred_companies=preferred_companies,
+        resume_content=resume_content[:RESUME_PROMPT_CHARS] if resume_content else None
+    )
+
+def build_search_prompt(
     job_title: str, 
     location: str, 
     skills: List[str] = None,
@@ -13,10 +171,8 @@ def search_jobs_gemini(
     resume_content: str = None
 ) -> str:
     """
-    Enhanced job search with resume matching and company preferences
+    Build the job search prompt from all available information
     """
-    
-    # Build the prompt with all available information
     prompt_parts = [
         f"Find up to 20 job openings for '{job_title}' in '{location}'."
     ]
@@ -31,7 +187,7 @@ def search_jobs_gemini(
     
     if resume_content:
         # Extract key information from resume for better matching
-        prompt_parts.append(f"Match jobs based on this resume content: {resume_content[:500]}...")
+        prompt_parts.append(f"Match jobs based on this resume content: {resume_content[:RESUME_PROMPT_CHARS]}...")
     
     prompt_parts.extend([
         "Return results as a JSON array with these exact keys:",
@@ -50,68 +206,139 @@ def search_jobs_gemini(
     prompt_parts.append("Ensure all URLs are direct application links, not just company homepages.")
     prompt_parts.append("If no direct application URL is available, use the job posting URL.")
     
-    prompt_text = " ".join(prompt_parts)
+    return " ".join(prompt_parts)
+
+def search_jobs_gemini(
+    job_title: str, 
+    location: str, 
+    skills: List[str] = None,
+    preferred_companies: List[str] = None,
+    resume_content: str = None
+) -> str:
+    """
+    Enhanced job search with resume matching and company preferences
+    """
+    prompt_text = build_search_prompt(job_title, location, skills, preferred_companies, resume_content)
     
     try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt_text,
-        )
+        with span("gemini.generate"):
+            response = get_gemini_client().models.generate_content(
+                model=GEMINI_MODEL,
+                contents=prompt_text,
+            )
         return response.text
     except Exception as e:
         print(f"Error calling Gemini API: {e}")
         return "[]"
 
+async def search_jobs_gemini_async(
+    job_title: str, 
+    location: str, 
+    skills: List[str] = None,
+    preferred_companies: List[str] = None,
+    resume_content: str = None
+) -> str:
+    """
+    Async version of search_jobs_gemini using the SDK's asyncio client,
+    so waiting on the model does not hold a worker thread
+    """
+    prompt_text = build_search_prompt(job_title, location, skills, preferred_companies, resume_content)
+    
+    try:
+        async with _gemini_semaphore():
+            with span("gemini.generate"):
+                response = await get_gemini_client().aio.models.generate_content(
+                    model=GEMINI_MODEL,
+                    contents=prompt_text,
+                )
+        return response.text
+    except Exception as e:
+        raise GeminiUnavailable(str(e)) from e
+
+async def stream_jobs_gemini_async(
+    job_title: str, 
+    location: str, 
+    skills: List[str] = None,
+    preferred_companies: List[str] = None,
+    resume_content: str = None
+) -> AsyncIterator[str]:
+    """
+    Stream the raw response text chunk by chunk as the model generates it
+    """
+    prompt_text = build_search_prompt(job_title, location, skills, preferred_companies, resume_content)
+    
+    async with _gemini_semaphore():
+        with span("gemini.stream"):
+            stream = await get_gemini_client().aio.models.generate_content_stream(
+                model=GEMINI_MODEL,
+                contents=prompt_text,
+            )
+            async for chunk in stream:
+                if chunk.text:
+                    yield chunk.text
+
+def clean_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill in defaults for missing job fields and tag the skills the posting mentions"""
+    return {
+        'title': job.get('title', 'No title'),
+        'company': job.get('company', 'Unknown company'),
+        'location': job.get('location', 'Unknown location'),
+        'description': job.get('description', 'No description'),
+        'url': job.get('url') or job.get('application_url', '#'),
+        'application_url': job.get('application_url') or job.get('url', '#'),
+        'salary_range': job.get('salary_range', 'Not specified'),
+        'job_type': job.get('job_type', 'Not specified'),
+        'experience_level': job.get('experience_level', 'Not specified'),
+        'posted_date': job.get('posted_date', '2024-01-01'),
+        'skills': tag_job_skills(job)
+    }
+
+
 def parse_jobs_response(response_text: str) -> List[Dict[str, Any]]:
     """
-    Parse the Gemini response and extract job listings
+    Parse the Gemini response and extract job listings.
+    Malformed or truncated job objects are skipped without losing the others.
     """
     try:
-        # Try to extract JSON from the response
-        json_match = re.search(r"```json(.*?)```", response_text, re.DOTALL)
-        if json_match:
-            json_str = json_match.group(1).strip()
-        else:
-            # If no JSON block, try to find JSON in the response
-            json_str = response_text.strip()
-            if not json_str.startswith('['):
-                # Try to find array in the text
-                array_match = re.search(r'\[.*\]', response_text, re.DOTALL)
-                if array_match:
-                    json_str = array_match.group(0)
-        
-        jobs = json.loads(json_str)
-        if not isinstance(jobs, list):
-            jobs = []
-        
-        # Validate and clean job data
-        cleaned_jobs = []
-        for job in jobs:
-            if isinstance(job, dict):
-                cleaned_job = {
-                    'title': job.get('title', 'No title'),
-                    'company': job.get('company', 'Unknown company'),
-                    'location': job.get('location', 'Unknown location'),
-                    'description': job.get('description', 'No description'),
-                    'url': job.get('url') or job.get('application_url', '#'),
-                    'application_url': job.get('application_url') or job.get('url', '#'),
-                    'salary_range': job.get('salary_range', 'Not specified'),
-                    'job_type': job.get('job_type', 'Not specified'),
-                    'experience_level': job.get('experience_level', 'Not specified'),
-                    'posted_date': job.get('posted_date', '2024-01-01')
-                }
-                cleaned_jobs.append(cleaned_job)
+        with span("gemini.parse"):
+            jobs = parse_job_objects(response_text or "")
+            
+            # Validate and clean job data
+            cleaned_jobs = [clean_job(job) for job in jobs]
         
-        return cleaned_jobs[:20]  # Ensure max 20 jobs
+        return cleaned_jobs[:MAX_JOBS]  # Ensure max 20 jobs
         
-    except json.JSONDecodeError as e:
-        print(f"JSON parsing error: {e}")
-        print(f"Response text: {response_text}")
-        return []
     except Exception as e:
         print(f"Error parsing jobs response: {e}")
         return []
 
+def _search_jobs_uncoalesced(
+    cache_key: str,
+    job_title: str,
+    location: str,
+    skills: List[str] = None,
+    preferred_companies: List[str] = None,
+    resume_content: str = None
+) -> List[Dict[str, Any]]:
+    cache = get_search_cache()
+    cached_jobs = cache.get(cache_key)
+    if cached_jobs is not None:
+        return cached_jobs
+    
+    response = search_jobs_gemini(
+        job_title=job_title,
+        location=location,
+        skills=skills,
+        preferred_companies=preferred_companies,
+        resume_content=resume_content
+    )
+    
+    jobs = parse_jobs_response(response)
+    # Empty results usually mean the model call failed, so don't cache them
+    if jobs:
+        cache.set(cache_key, jobs)
+    return jobs
+
 def search_jobs_with_resume(
     job_title: str,
     location: str,
@@ -120,9 +347,42 @@ def search_jobs_with_resume(
     resume_content: str = None
 ) -> List[Dict[str, Any]]:
     """
-    Main function to search jobs with all parameters
+    Main function to search jobs with all parameters.
+    Results are served from the search cache when the same normalized query was seen recently,
+    and identical searches running at the same time share one model call.
     """
-    response = search_jobs_gemini(
+    cache_key = _search_key(job_title, location, skills, preferred_companies, resume_content)
+    return _search_flight.do(
+        cache_key,
+        _search_jobs_uncoalesced,
+        cache_key,
+        job_title=job_title,
+        location=location,
+        skills=skills,
+        preferred_companies=preferred_companies,
+        resume_content=resume_content
+    )
+
+async def _cache_call(fn: Callable, *args):
+    # File-backed caches may wait on a lock, so keep them off the event loop
+    if get_search_cache().blocking:
+        return await run_in_threadpool(fn, *args)
+    return fn(*args)
+
+async def _search_jobs_async_uncoalesced(
+    cache_key: str,
+    job_title: str,
+    location: str,
+    skills: List[str] = None,
+    preferred_companies: List[str] = None,
+    resume_content: str = None
+) -> List[Dict[str, Any]]:
+    cache = get_search_cache()
+    cached_jobs = await _cache_call(cache.get, cache_key)
+    if cached_jobs is not None:
+        return cached_jobs
+    
+    response = await search_jobs_gemini_async(
         job_title=job_title,
         location=location,
         skills=skills,
@@ -130,4 +390,81 @@ def search_jobs_with_resume(
         resume_content=resume_content
     )
     
-    return parse_jobs_response(response)
+    jobs = parse_jobs_response(response)
+    if jobs:
+        await _cache_call(cache.set, cache_key, jobs)
+    return jobs
+
+async def search_jobs_with_resume_async(
+    job_title: str,
+    location: str,
+    skills: List[str] = None,
+    preferred_companies: List[str] = None,
+    resume_content: str = None,
+    raise_errors: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Async version of search_jobs_with_resume for request handlers. Uses the same
+    cache, and identical concurrent searches await one shared task. A failed model
+    call returns no jobs, or raises GeminiUnavailable when raise_errors is set.
+    """
+    cache_key = _search_key(job_title, location, skills, preferred_companies, resume_content)
+    try:
+        return await _async_search_flight.do(
+            cache_key,
+            _search_jobs_async_uncoalesced,
+            cache_key,
+            job_title=job_title,
+            location=location,
+            skills=skills,
+            preferred_companies=preferred_companies,
+            resume_content=resume_content
+        )
+    except GeminiUnavailable as e:
+        if raise_errors:
+            raise
+        print(f"Error calling Gemini API: {e}")
+        return []
+
+async def stream_jobs_with_resume_async(
+    job_title: str,
+    location: str,
+    skills: List[str] = None,
+    preferred_companies: List[str] = None,
+    resume_content: str = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield cleaned jobs one at a time as the model streams them. Cached results are
+    replayed immediately and a completed stream populates the cache for later searches.
+    """
+    cache = get_search_cache()
+    cache_key = _search_key(job_title, location, skills, preferred_companies, resume_content)
+    cached_jobs = await _cache_call(cache.get, cache_key)
+    if cached_jobs is not None:
+        for job in cached_jobs:
+            yield job
+        return
+    
+    parser = JobStreamParser()
+    jobs: List[Dict[str, Any]] = []
+    # Closing the model stream on an early break releases its semaphore slot and connection right away
+    async with contextlib.aclosing(stream_jobs_gemini_async(
+        job_title=job_title,
+        location=location,
+        skills=skills,
+        preferred_companies=preferred_companies,
+        resume_content=resume_content
+    )) as chunks:
+        async for chunk in chunks:
+            for job in parser.feed(chunk):
+                job = clean_job(job)
+                jobs.append(job)
+                yield job
+                if len(jobs) >= MAX_JOBS:
+                    break
+            if len(jobs) >= MAX_JOBS:
+                break
+    parser.close()
+    
+    if jobs:
+        await _cache_call(cache.set, cache_key, jobs)
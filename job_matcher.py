@@ -0,0 +1,343 @@
+"""
+Reverse job matching. Every listing a search stores is checked against all
+saved preferences, so a job one user's search paid for reaches everyone it
+suits. New listings are claimed in batches with a lease, narrowed to candidate
+users with the preference index (title and location words, skills), scored
+with the job ranker and queued as WhatsApp alerts through the outbox.
+
+Run with `python -m backend.job_matcher` or set JOB_MATCHER_ENABLED=True.
+"""
+import argparse
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from . import models, database
+from .job_ranking import JobCorpus
+from .notifications import enqueue_whatsapp_message, format_job_match_message, make_idempotency_key
+from .preference_index import PreferenceIndex, get_preference_index
+from .skill_extractor import tag_job_skills
+
+load_dotenv()
+
+JOB_MATCHER_ENABLED = os.getenv("JOB_MATCHER_ENABLED", "False").lower() == "true"
+JOB_MATCH_BATCH_SIZE = int(os.getenv("JOB_MATCH_BATCH_SIZE", 500))
+JOB_MATCH_POLL_SECONDS = float(os.getenv("JOB_MATCH_POLL_SECONDS", 5))
+JOB_MATCH_CLAIM_LEASE_SECONDS = int(os.getenv("JOB_MATCH_CLAIM_LEASE_SECONDS", 300))
+JOB_MATCH_MAX_AGE_HOURS = int(os.getenv("JOB_MATCH_MAX_AGE_HOURS", 48))
+JOB_MATCH_MAX_JOBS_PER_USER = int(os.getenv("JOB_MATCH_MAX_JOBS_PER_USER", 5))
+JOB_MATCH_MIN_SCORE = float(os.getenv("JOB_MATCH_MIN_SCORE", 0))
+
+# Users per scoring matrix product and per IN (...) list
+SCORE_CHUNK_SIZE = 500
+QUERY_CHUNK_SIZE = 1000
+
+_LISTING_COLUMNS = (
+    models.JobListing.id,
+    models.JobListing.title,
+    models.JobListing.company,
+    models.JobListing.location,
+    models.JobListing.posted_date,
+    models.JobListing.description,
+    models.JobListing.url,
+    models.JobListing.application_url,
+    models.JobListing.salary_range,
+    models.JobListing.job_type,
+    models.JobListing.experience_level,
+    models.JobListing.fingerprint,
+)
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _split(value: Optional[str]) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()] if value else []
+
+def _chunks(values: List[Any], size: int = QUERY_CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def _due_filter(now: datetime):
+    # A claim whose lease has run out belongs to a matcher that died mid-batch
+    return and_(
+        models.JobListing.matched_at == None,
+        or_(
+            models.JobListing.match_lease_until == None,
+            models.JobListing.match_lease_until <= now
+        )
+    )
+
+def claim_new_listings(
+    db: Session,
+    batch_size: int = JOB_MATCH_BATCH_SIZE,
+    lease_seconds: int = JOB_MATCH_CLAIM_LEASE_SECONDS,
+    max_age_hours: int = JOB_MATCH_MAX_AGE_HOURS
+) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+    """Claim up to batch_size unmatched listings; returns the claim token and the listings as job dicts"""
+    now = _utcnow()
+    # Listings that waited past the age limit (e.g. while the matcher was off) are closed without alerts
+    db.query(models.JobListing).filter(
+        models.JobListing.matched_at == None,
+        models.JobListing.created_at < now - timedelta(hours=max_age_hours)
+    ).update({models.JobListing.matched_at: now}, synchronize_session=False)
+
+    due = _due_filter(now)
+    candidate_ids = [
+        row.id for row in db.query(models.JobListing.id)
+        .filter(due)
+        .order_by(models.JobListing.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    ]
+    if not candidate_ids:
+        db.commit()
+        return None, []
+
+    token = str(uuid.uuid4())
+    db.query(models.JobListing).filter(
+        models.JobListing.id.in_(candidate_ids), due
+    ).update(
+        {
+            models.JobListing.match_claim_token: token,
+            models.JobListing.match_lease_until: now + timedelta(seconds=lease_seconds),
+        },
+        synchronize_session=False
+    )
+    db.commit()
+
+    rows = db.query(*_LISTING_COLUMNS).filter(
+        models.JobListing.id.in_(candidate_ids),
+        models.JobListing.match_claim_token == token
+    ).order_by(models.JobListing.id).all()
+    jobs = []
+    for row in rows:
+        job = dict(row._mapping)
+        job["posted_date"] = job["posted_date"].isoformat() if job["posted_date"] else None
+        jobs.append(job)
+    return token, jobs
+
+def match_candidates(index: PreferenceIndex, jobs: List[Dict[str, Any]]) -> Dict[int, List[int]]:
+    """Prefilter: for each user the index pairs with any of the jobs, the positions of those jobs"""
+    candidates: Dict[int, List[int]] = {}
+    for position, job in enumerate(jobs):
+        for user_id in index.users_for_posting(job["title"], job["location"], tag_job_skills(job)):
+            candidates.setdefault(user_id, []).append(position)
+    return candidates
+
+def load_alert_profiles(db: Session, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Preferences of the given users who have alerts on and a WhatsApp number"""
+    profiles = {}
+    for chunk in _chunks(user_ids):
+        rows = db.query(
+            models.UserPreference.user_id,
+            models.UserPreference.job_title,
+            models.UserPreference.location,
+            models.UserPreference.skills,
+            models.UserPreference.preferred_companies,
+            models.UserPreference.whatsapp_number,
+        ).filter(
+            models.UserPreference.user_id.in_(chunk),
+            models.UserPreference.alerts_enabled == True,
+            models.UserPreference.whatsapp_number != None
+        ).all()
+        user_names = dict(
+            db.query(models.User.id, models.User.name).filter(
+                models.User.id.in_({row.user_id for row in rows})
+            ).all()
+        ) if rows else {}
+        for row in rows:
+            profiles[row.user_id] = {
+                "user_id": row.user_id,
+                "user_name": user_names.get(row.user_id, "there"),
+                "job_title": row.job_title,
+                "location": row.location,
+                "skills": _split(row.skills),
+                "preferred_companies": _split(row.preferred_companies),
+                "whatsapp_number": row.whatsapp_number,
+            }
+    return profiles
+
+def seen_positions(db: Session, user_ids: List[int], jobs: List[Dict[str, Any]]) -> Dict[int, Set[int]]:
+    """Per user, positions of jobs to skip: already sent to them or shown in their own searches"""
+    positions_by_fingerprint = {job["fingerprint"]: position for position, job in enumerate(jobs)}
+    positions_by_id = {job["id"]: position for position, job in enumerate(jobs)}
+    seen: Dict[int, Set[int]] = {}
+    for chunk in _chunks(user_ids):
+        for user_id, fingerprint in db.query(
+            models.SentJobAlert.user_id, models.SentJobAlert.job_fingerprint
+        ).filter(
+            models.SentJobAlert.user_id.in_(chunk),
+            models.SentJobAlert.job_fingerprint.in_(list(positions_by_fingerprint))
+        ):
+            seen.setdefault(user_id, set()).add(positions_by_fingerprint[fingerprint])
+        for user_id, listing_id in db.query(
+            models.UserJobResult.user_id, models.UserJobResult.job_listing_id
+        ).filter(
+            models.UserJobResult.user_id.in_(chunk),
+            models.UserJobResult.job_listing_id.in_(list(positions_by_id))
+        ):
+            seen.setdefault(user_id, set()).add(positions_by_id[listing_id])
+    return seen
+
+def select_matches(
+    jobs: List[Dict[str, Any]],
+    candidates: Dict[int, List[int]],
+    profiles: Dict[int, Dict[str, Any]],
+    seen: Dict[int, Set[int]],
+    max_jobs: int = JOB_MATCH_MAX_JOBS_PER_USER,
+    min_score: float = JOB_MATCH_MIN_SCORE
+) -> Dict[int, List[Dict[str, Any]]]:
+    """Score every candidate against the batch and keep each user's best unseen jobs"""
+    corpus = JobCorpus(jobs)
+    user_ids = [user_id for user_id in candidates if user_id in profiles]
+    matches = {}
+    for chunk in _chunks(user_ids, SCORE_CHUNK_SIZE):
+        # The title counts as one more skill, so users who listed no skills still get scored
+        scores = corpus.score([
+            {
+                "skills": profiles[user_id]["skills"] + [profiles[user_id]["job_title"]],
+                "preferred_companies": profiles[user_id]["preferred_companies"],
+            }
+            for user_id in chunk
+        ])
+        eligible = np.zeros(scores.shape, dtype=bool)
+        for row, user_id in enumerate(chunk):
+            eligible[row, candidates[user_id]] = True
+            eligible[row, list(seen.get(user_id, ()))] = False
+        scores = np.where(eligible & (scores >= min_score), scores, -np.inf)
+        best = np.argsort(-scores, axis=1, kind="stable")[:, :max_jobs]
+        for row, user_id in enumerate(chunk):
+            positions = [position for position in best[row] if scores[row, position] > -np.inf]
+            if positions:
+                matches[user_id] = [jobs[position] for position in positions]
+    return matches
+
+def complete_listings(
+    db: Session,
+    token: str,
+    jobs: List[Dict[str, Any]],
+    matches: Dict[int, List[Dict[str, Any]]],
+    profiles: Dict[int, Dict[str, Any]]
+) -> Optional[Dict[int, List[Dict[str, Any]]]]:
+    """
+    Queue the alerts and mark the batch matched in one transaction. Returns the jobs
+    actually alerted per user, or None if the claim was lost.
+    """
+    now = _utcnow()
+    listing_ids = [job["id"] for job in jobs]
+    owned = db.query(models.JobListing).filter(
+        models.JobListing.id.in_(listing_ids),
+        models.JobListing.match_claim_token == token
+    ).update(
+        {
+            models.JobListing.matched_at: now,
+            models.JobListing.match_claim_token: None,
+            models.JobListing.match_lease_until: None,
+        },
+        synchronize_session=False
+    )
+    if owned != len(listing_ids):
+        # Another matcher took over after the lease ran out and will send these
+        db.rollback()
+        return None
+
+    # A scheduled alert may have sent some of these since seen_positions ran; only alert what this insert claimed
+    inserted = database.insert_ignoring_conflicts(db, models.SentJobAlert, [
+        {"user_id": user_id, "job_fingerprint": job["fingerprint"]}
+        for user_id, user_jobs in matches.items()
+        for job in user_jobs
+    ], ("user_id", "job_fingerprint"))
+    inserted_keys = {(row["user_id"], row["job_fingerprint"]) for row in inserted}
+    sent = {}
+    for user_id, user_jobs in matches.items():
+        user_jobs = [job for job in user_jobs if (user_id, job["fingerprint"]) in inserted_keys]
+        if not user_jobs:
+            continue
+        profile = profiles[user_id]
+        fingerprints = [job["fingerprint"] for job in user_jobs]
+        message = format_job_match_message(profile["user_name"], profile["job_title"], profile["location"], user_jobs)
+        idempotency_key = make_idempotency_key("match", user_id, *sorted(fingerprints))
+        enqueue_whatsapp_message(db, profile["whatsapp_number"], message, idempotency_key, user_id=user_id)
+        sent[user_id] = user_jobs
+    db.commit()
+    return sent
+
+def match_new_listings(db: Session, index: PreferenceIndex, batch_size: int = JOB_MATCH_BATCH_SIZE) -> Dict[str, int]:
+    """Claim one batch of new listings and alert every user they suit"""
+    token, jobs = claim_new_listings(db, batch_size)
+    stats = {"claimed": len(jobs), "candidates": 0, "notified": 0, "jobs_sent": 0}
+    if not jobs:
+        return stats
+    candidates = match_candidates(index, jobs)
+    profiles = load_alert_profiles(db, list(candidates))
+    seen = seen_positions(db, list(profiles), jobs)
+    matches = select_matches(jobs, candidates, profiles, seen)
+    sent = complete_listings(db, token, jobs, matches, profiles)
+    if sent is not None:
+        stats["candidates"] = len(candidates)
+        stats["notified"] = len(sent)
+        stats["jobs_sent"] = sum(len(user_jobs) for user_jobs in sent.values())
+    return stats
+
+
+class JobMatcher:
+    """Matches new listings batch by batch; woken by searches that store listings"""
+
+    def __init__(self, batch_size: int = JOB_MATCH_BATCH_SIZE, poll_seconds: float = JOB_MATCH_POLL_SECONDS):
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self._wake = asyncio.Event()
+
+    def wake(self):
+        """Check for new listings now instead of at the next poll"""
+        self._wake.set()
+
+    def _match_batch(self) -> Dict[str, int]:
+        index = get_preference_index()
+        with database.SessionLocal() as db:
+            return match_new_listings(db, index, self.batch_size)
+
+    async def run_once(self) -> Dict[str, int]:
+        """Match one batch of new listings"""
+        return await run_in_threadpool(self._match_batch)
+
+    async def run_forever(self):
+        while True:
+            try:
+                stats = await self.run_once()
+                if stats["claimed"]:
+                    print(f"Job matcher run: {stats}")
+            except Exception as e:
+                # The claim is left in place, so the batch is retried when its lease expires
+                print(f"Job matcher error: {e}")
+                stats = {"claimed": 0}
+            # Keep draining while there is a backlog; otherwise wait for a wake-up or the next poll
+            if stats["claimed"] < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+
+def main():
+    parser = argparse.ArgumentParser(description="Alert users about newly stored job listings")
+    parser.add_argument("--once", action="store_true", help="Match one batch and exit")
+    args = parser.parse_args()
+
+    matcher = JobMatcher()
+    if args.once:
+        print(asyncio.run(matcher.run_once()))
+    else:
+        asyncio.run(matcher.run_forever())
+
+if __name__ == "__main__":
+    main()
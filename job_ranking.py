@@ -0,0 +1,130 @@
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .search_cache import normalize_text
+
+# BM25 parameters for the job side of the score
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Relative weight of each part of a user profile
+SKILL_WEIGHT = 3.0
+RESUME_WEIGHT = 2.0
+COMPANY_BOOST = 5.0
+
+# Title words count more than description words
+TITLE_REPEAT = 2
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it of on or our the to we with you your "
+    "will this that their they i me my am was were been".split()
+)
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return [t for t in _TOKEN.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+class JobCorpus:
+    """
+    BM25 term weights for a batch of jobs. Built once per result set and shared
+    by every user ranked against it, so ranking many users is one matrix product.
+    """
+
+    def __init__(self, jobs: Sequence[Dict[str, Any]]):
+        self.jobs = list(jobs)
+        self.vocabulary: Dict[str, int] = {}
+        rows, cols, counts = [], [], []
+        doc_lengths = np.zeros(len(self.jobs), dtype=np.float32)
+
+        for row, job in enumerate(self.jobs):
+            tokens = tokenize(job.get("title")) * TITLE_REPEAT + tokenize(job.get("description"))
+            doc_lengths[row] = len(tokens)
+            for token, count in Counter(tokens).items():
+                col = self.vocabulary.setdefault(token, len(self.vocabulary))
+                rows.append(row)
+                cols.append(col)
+                counts.append(count)
+
+        tf = np.zeros((len(self.jobs), len(self.vocabulary)), dtype=np.float32)
+        if counts:
+            tf[rows, cols] = counts
+
+        n_jobs = max(len(self.jobs), 1)
+        df = np.count_nonzero(tf, axis=0).astype(np.float32)
+        idf = np.log1p((n_jobs - df + 0.5) / (df + 0.5))
+        avg_length = float(doc_lengths.mean()) if len(self.jobs) and doc_lengths.mean() > 0 else 1.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths / avg_length)
+        self.weights = idf * (tf * (BM25_K1 + 1)) / (tf + norm[:, None])
+
+        companies = [normalize_text(job.get("company")) for job in self.jobs]
+        self.company_index: Dict[str, int] = {}
+        company_cols = [self.company_index.setdefault(c, len(self.company_index)) for c in companies]
+        self.company_matrix = np.zeros((len(self.jobs), len(self.company_index)), dtype=np.float32)
+        if self.jobs:
+            self.company_matrix[np.arange(len(self.jobs)), company_cols] = 1.0
+
+    def profile_matrices(self, profiles: Sequence[Dict[str, Any]]):
+        """Query term weights and preferred-company indicators, one row per profile"""
+        queries = np.zeros((len(profiles), len(self.vocabulary)), dtype=np.float32)
+        companies = np.zeros((len(profiles), len(self.company_index)), dtype=np.float32)
+
+        for row, profile in enumerate(profiles):
+            for skill in profile.get("skills") or []:
+                skill_tokens = [self.vocabulary.get(t) for t in tokenize(skill)]
+                skill_tokens = [col for col in skill_tokens if col is not None]
+                for col in skill_tokens:
+                    # A multi-word skill adds up to one skill's weight in total
+                    queries[row, col] += SKILL_WEIGHT / len(skill_tokens)
+
+            resume_counts = Counter(tokenize(profile.get("resume_content")))
+            resume_cols = [(self.vocabulary[t], math.log1p(c)) for t, c in resume_counts.items() if t in self.vocabulary]
+            if resume_cols:
+                cols, values = zip(*resume_cols)
+                values = np.asarray(values, dtype=np.float32)
+                queries[row, list(cols)] += RESUME_WEIGHT * values / np.linalg.norm(values)
+
+            for company in profile.get("preferred_companies") or []:
+                col = self.company_index.get(normalize_text(company))
+                if col is not None:
+                    companies[row, col] = 1.0
+
+        return queries, companies
+
+    def score(self, profiles: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Scores with shape (len(profiles), len(jobs))"""
+        if not self.jobs or not profiles:
+            return np.zeros((len(profiles), len(self.jobs)), dtype=np.float32)
+        queries, companies = self.profile_matrices(profiles)
+        return queries @ self.weights.T + COMPANY_BOOST * (companies @ self.company_matrix.T)
+
+    def rank(self, profiles: Sequence[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Jobs ordered best-first for each profile; ties keep the original order"""
+        scores = self.score(profiles)
+        order = np.argsort(-scores, axis=1, kind="stable")
+        return [[self.jobs[i] for i in row] for row in order]
+
+def rank_jobs_for_users(jobs: List[dict], profiles: Sequence[Dict[str, Any]]) -> List[List[dict]]:
+    """
+    Rank one shared result set for many users. Each profile is a dict with
+    optional skills, preferred_companies and resume_content.
+    """
+    return JobCorpus(jobs).rank(profiles)
+
+def rank_jobs_for_user(
+    jobs: List[dict],
+    skills: List[str] = None,
+    preferred_companies: List[str] = None,
+    resume_content: str = None
+) -> List[dict]:
+    """Rank a result set for a single user"""
+    profile = {
+        "skills": skills,
+        "preferred_companies": preferred_companies,
+        "resume_content": resume_content,
+    }
+    return rank_jobs_for_users(jobs, [profile])[0]
@@ -0,0 +1,135 @@
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from . import models, database
+from .metrics import span
+
+def _parse_posted_date(posted_date_str):
+    if not posted_date_str:
+        return None
+    try:
+        return datetime.strptime(posted_date_str, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return datetime.now().date()
+
+def _text(value, max_length: int = None):
+    # Model output is not guaranteed to be strings or to fit the column
+    if value is None:
+        return None
+    return str(value)[:max_length] if max_length else str(value)
+
+def job_listing_row(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Column values for a job returned by a search"""
+    return {
+        "title": _text(job['title'], 200),
+        "company": _text(job['company'], 100),
+        "location": _text(job['location'], 100),
+        "posted_date": _parse_posted_date(job.get('posted_date')),
+        "description": _text(job['description']),
+        "url": _text(job['url'], 500),
+        "application_url": _text(job['application_url'], 500),
+        "salary_range": _text(job['salary_range'], 100),
+        "job_type": _text(job['job_type'], 50),
+        "experience_level": _text(job['experience_level'], 50),
+        "fingerprint": models.job_fingerprint(job),
+    }
+
+def save_job_listings(db: Session, jobs: List[Dict[str, Any]]) -> List[str]:
+    """
+    Store the jobs from one search with a single INSERT ... ON CONFLICT DO NOTHING,
+    so a posting that was already stored by an earlier search is not duplicated.
+    Runs in the caller's transaction and returns the fingerprints of all given jobs.
+    """
+    rows = {}
+    for job in jobs:
+        row = job_listing_row(job)
+        rows.setdefault(row["fingerprint"], row)
+    if not rows:
+        return []
+    
+    with span("db.insert_listings"):
+        database.insert_ignoring_conflicts(db, models.JobListing, list(rows.values()), "fingerprint")
+    
+    return list(rows)
+
+def record_search_run(
+    db: Session,
+    user_id: int,
+    job_title: str,
+    location: str,
+    jobs: List[Dict[str, Any]]
+) -> models.SearchRun:
+    """
+    Store the listings from a search and link them to the user through a new
+    search run, in the caller's transaction
+    """
+    fingerprints = save_job_listings(db, jobs)
+    
+    search_run = models.SearchRun(
+        user_id=user_id,
+        job_title=_text(job_title, 100),
+        location=_text(location, 100),
+        total_jobs=len(jobs)
+    )
+    db.add(search_run)
+    with span("db.flush"):
+        db.flush()
+    
+    if fingerprints:
+        listing_ids = dict(db.execute(
+            select(models.JobListing.fingerprint, models.JobListing.id)
+            .where(models.JobListing.fingerprint.in_(fingerprints))
+        ).all())
+        db.execute(models.UserJobResult.__table__.insert(), [
+            {
+                "user_id": user_id,
+                "search_run_id": search_run.id,
+                "job_listing_id": listing_ids[fingerprint],
+                "rank": rank,
+            }
+            for rank, fingerprint in enumerate(fingerprints)
+            if fingerprint in listing_ids
+        ])
+    return search_run
+
+def get_user_job_history(
+    db: Session,
+    user_id: int,
+    limit: int = 50,
+    cursor: Optional[Tuple[int, int]] = None
+) -> Tuple[List[Tuple[models.UserJobResult, models.JobListing]], Optional[Tuple[int, int]]]:
+    """
+    One page of a user's search results: newest search first, each search in the order
+    it was shown. Keyset pagination on (search_run_id, rank), so every page is an index
+    range scan. Returns the page and the cursor for the next one (None at the end).
+    """
+    query = db.query(models.UserJobResult, models.JobListing).join(
+        models.JobListing, models.JobListing.id == models.UserJobResult.job_listing_id
+    ).filter(models.UserJobResult.user_id == user_id)
+    if cursor is not None:
+        run_id, rank = cursor
+        query = query.filter(or_(
+            models.UserJobResult.search_run_id < run_id,
+            and_(models.UserJobResult.search_run_id == run_id, models.UserJobResult.rank > rank)
+        ))
+    
+    rows = query.order_by(
+        models.UserJobResult.search_run_id.desc(), models.UserJobResult.rank
+    ).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        last_result = rows[limit - 1][0]
+        next_cursor = (last_result.search_run_id, last_result.rank)
+    return rows[:limit], next_cursor
+
+def encode_history_cursor(cursor: Optional[Tuple[int, int]]) -> Optional[str]:
+    return f"{cursor[0]}:{cursor[1]}" if cursor else None
+
+def decode_history_cursor(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Parse a cursor from encode_history_cursor; raises ValueError if malformed"""
+    if not value:
+        return None
+    run_id, rank = value.split(":")
+    return int(run_id), int(rank)
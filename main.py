@@ -1,38 +1,35 @@
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form
-from fastapi.concurrency import run_in_threadpool
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from . import models, database, auth
-from .gemini_client import search_jobs_with_resume
-from .resume_parser import parse_resume
-from twilio.rest import Client
+from .gemini_client import search_jobs_with_resume_async, single_flight_stats, stream_jobs_with_resume_async
+from .resume_extraction import shutdown_resume_pool
+from .resume_worker import RESUME_WORKER_ENABLED, ResumeWorker
+from .preference_index import sync_preference_terms, update_preference_index
+from .resume_store import ResumeTooLarge, get_resume_store
+from .upload_limits import UploadSizeLimitMiddleware
+from .search_cache import get_search_cache
+from .job_ranking import rank_jobs_for_user
+from .job_store import decode_history_cursor, encode_history_cursor, get_user_job_history, record_search_run
+from .notifications import enqueue_whatsapp_message, format_search_results_message, make_idempotency_key
+from .notification_worker import NOTIFICATION_WORKER_ENABLED, NotificationWorker
+from .alert_scheduler import ALERT_SCHEDULER_ENABLED, AlertScheduler
+from .job_matcher import JOB_MATCHER_ENABLED, JobMatcher
+from .metrics import METRICS_ENABLED, MetricsMiddleware, render_metrics, span
+from .profiler import PROFILER_DEFAULT_INTERVAL_MS, PROFILER_MAX_SECONDS, ProfilerBusy, run_profile
+import asyncio
 import re
 import json
 import os
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import List, Literal, Optional, Tuple
 
 load_dotenv()
 
-# Twilio WhatsApp Config (Sandbox)
-ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
-AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
-TWILIO_WHATSAPP_NUMBER = os.getenv("TWILIO_WHATSAPP_FROM")
-
-twilio_client = Client(ACCOUNT_SID, AUTH_TOKEN)
-
-def send_whatsapp_message(to_number: str, body_text: str):
-    if not to_number.startswith("whatsapp:"):
-        to_number = f"whatsapp:{to_number}"
-    message = twilio_client.messages.create(
-        body=body_text,
-        from_=TWILIO_WHATSAPP_NUMBER,
-        to=to_number
-    )
-    return message.sid
-
 app = FastAPI(title="Spinabot Job Agent API", version="2.0.0")
 
 # CORS middleware
@@ -43,8 +40,72 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(UploadSizeLimitMiddleware, paths=["/save-preferences"])
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+@app.on_event("startup")
+def create_tables():
+    """Create missing tables on startup rather than at import, so importing the app never touches the database"""
+    if database.DB_CREATE_TABLES:
+        models.Base.metadata.create_all(bind=database.engine)
+
+@app.on_event("startup")
+async def start_alert_scheduler():
+    """Run the alert scheduler inside this process when enabled"""
+    if ALERT_SCHEDULER_ENABLED:
+        app.state.alert_scheduler_task = asyncio.create_task(AlertScheduler().run_forever())
+
+@app.on_event("shutdown")
+async def stop_alert_scheduler():
+    task = getattr(app.state, "alert_scheduler_task", None)
+    if task:
+        task.cancel()
+
+@app.on_event("startup")
+def start_notification_worker():
+    """Deliver queued WhatsApp messages from this process when enabled"""
+    if NOTIFICATION_WORKER_ENABLED:
+        app.state.notification_worker = NotificationWorker()
+        app.state.notification_worker.start()
+
+@app.on_event("shutdown")
+def stop_notification_worker():
+    worker = getattr(app.state, "notification_worker", None)
+    if worker:
+        worker.stop()
 
-models.Base.metadata.create_all(bind=database.engine)
+@app.on_event("startup")
+async def start_resume_worker():
+    """Parse uploaded resumes in this process when enabled"""
+    if RESUME_WORKER_ENABLED:
+        app.state.resume_worker = ResumeWorker()
+        app.state.resume_worker_task = asyncio.create_task(app.state.resume_worker.run_forever())
+
+@app.on_event("shutdown")
+async def stop_resume_worker():
+    task = getattr(app.state, "resume_worker_task", None)
+    if task:
+        task.cancel()
+    shutdown_resume_pool()
+
+@app.on_event("startup")
+async def start_job_matcher():
+    """Match newly stored listings against saved preferences in this process when enabled"""
+    if JOB_MATCHER_ENABLED:
+        app.state.job_matcher = JobMatcher()
+        app.state.job_matcher_task = asyncio.create_task(app.state.job_matcher.run_forever())
+
+@app.on_event("shutdown")
+async def stop_job_matcher():
+    task = getattr(app.state, "job_matcher_task", None)
+    if task:
+        task.cancel()
+
+def _wake_job_matcher():
+    job_matcher = getattr(app.state, "job_matcher", None)
+    if job_matcher:
+        job_matcher.wake()
 
 # Pydantic models
 class UserSignup(BaseModel):
@@ -106,6 +167,7 @@ def signup(user_data: UserSignup, db: Session = Depends(database.get_db)):
         db.add(new_user)
         db.commit()
         db.refresh(new_user)
+        auth.invalidate_user(new_user.email)
         
         return {
             "status": "success",
@@ -151,6 +213,69 @@ def login(user_data: UserLogin, db: Session = Depends(database.get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Login failed: {str(e)}")
 
+def _store_preferences(
+    db: Session,
+    user_id: int,
+    job_title: str,
+    location: str,
+    skills_list: List[str],
+    companies_list: Optional[List[str]],
+    whatsapp_number: Optional[str],
+    linkedin_url: Optional[str],
+    email: Optional[str],
+    resume_filename: Optional[str],
+    resume_sha256: Optional[str]
+) -> Optional[int]:
+    """Save the user's preferences and queue their resume for parsing in one transaction; returns the resume job ID"""
+    try:
+        # Check if user already has preferences
+        existing_pref = db.query(models.UserPreference).filter(
+            models.UserPreference.user_id == user_id
+        ).first()
+        
+        if existing_pref:
+            # Update existing preferences
+            existing_pref.job_title = job_title
+            existing_pref.location = location
+            existing_pref.skills = ",".join(skills_list)
+            existing_pref.preferred_companies = ",".join(companies_list) if companies_list else None
+            existing_pref.whatsapp_number = whatsapp_number
+            existing_pref.linkedin_url = linkedin_url
+            existing_pref.email = email
+            existing_pref.next_alert_at = None  # Changed criteria are due for an alert right away
+            pref = existing_pref
+        else:
+            # Create new preferences
+            new_pref = models.UserPreference(
+                user_id=user_id,
+                job_title=job_title,
+                location=location,
+                skills=",".join(skills_list),
+                preferred_companies=",".join(companies_list) if companies_list else None,
+                whatsapp_number=whatsapp_number,
+                linkedin_url=linkedin_url,
+                email=email
+            )
+            db.add(new_pref)
+            db.flush()
+            pref = new_pref
+        sync_preference_terms(db, pref.id, user_id, skills_list, companies_list)
+        
+        resume_job = None
+        if resume_filename:
+            resume_job = models.ResumeJob(
+                user_id=user_id,
+                resume_filename=resume_filename,
+                resume_sha256=resume_sha256
+            )
+            db.add(resume_job)
+        
+        with span("db.commit"):
+            db.commit()
+        return resume_job.id if resume_job else None
+    finally:
+        db.close()
+
 @app.post("/save-preferences")
 async def save_preferences(
     job_title: str = Form(...),
@@ -161,7 +286,7 @@ async def save_preferences(
     linkedin_url: Optional[str] = Form(None),
     email: Optional[str] = Form(None),
     resume: Optional[UploadFile] = File(None),
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.UserSnapshot = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
     """Save user preferences with optional resume upload"""
@@ -172,72 +297,43 @@ async def save_preferences(
         if preferred_companies:
             companies_list = [c.strip() for c in preferred_companies.split(",") if c.strip()]
         
-        # Handle resume upload
+        # Handle resume upload; the file is stored now and parsed by the resume worker
         resume_filename = None
-        resume_data = None
-        resume_content = None
+        resume_sha256 = None
         
         if resume:
+            # Don't hold a pooled connection while the upload is copied
+            db.close()
             if resume.content_type not in ["application/pdf", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]:
                 raise HTTPException(status_code=400, detail="Only PDF and DOCX files are supported")
             
-            if resume.size > 10 * 1024 * 1024:  # 10MB limit
-                raise HTTPException(status_code=400, detail="File size too large. Maximum 10MB allowed")
-            
             resume_filename = resume.filename
-            resume_data = resume.file.read()
-            
-            # Parse resume content
-            parsed_resume = parse_resume(resume_data, resume_filename)
-            resume_content = parsed_resume["text"]
+            resume_store = get_resume_store()
+            # Copy the spooled upload into the store in chunks, hashing and enforcing the size limit as it goes
+            try:
+                resume_sha256, _ = await run_in_threadpool(resume_store.put_stream, resume.file)
+            except ResumeTooLarge as e:
+                raise HTTPException(status_code=413, detail=str(e))
             
-            # Update skills with resume-extracted skills
-            resume_skills = parsed_resume["skills"]
-            skills_list.extend(resume_skills)
-            skills_list = list(set(skills_list))  # Remove duplicates
-        
-        # Check if user already has preferences
-        existing_pref = db.query(models.UserPreference).filter(
-            models.UserPreference.user_id == current_user.id
-        ).first()
-        
-        if existing_pref:
-            # Update existing preferences
-            existing_pref.job_title = job_title
-            existing_pref.location = location
-            existing_pref.skills = ",".join(skills_list)
-            existing_pref.preferred_companies = ",".join(companies_list) if companies_list else None
-            existing_pref.whatsapp_number = whatsapp_number
-            existing_pref.linkedin_url = linkedin_url
-            existing_pref.email = email
-            if resume_filename:
-                existing_pref.resume_filename = resume_filename
-                existing_pref.resume_data = resume_data
-                existing_pref.resume_content = resume_content
-        else:
-            # Create new preferences
-            new_pref = models.UserPreference(
-                user_id=current_user.id,
-                job_title=job_title,
-                location=location,
-                skills=",".join(skills_list),
-                preferred_companies=",".join(companies_list) if companies_list else None,
-                whatsapp_number=whatsapp_number,
-                linkedin_url=linkedin_url,
-                email=email,
-                resume_filename=resume_filename,
-                resume_data=resume_data,
-                resume_content=resume_content
-            )
-            db.add(new_pref)
+        # The writes run in the threadpool: on SQLite they can wait on other writers
+        resume_job_id = await run_in_threadpool(
+            _store_preferences, db, current_user.id, job_title, location, skills_list, companies_list,
+            whatsapp_number, linkedin_url, email, resume_filename, resume_sha256
+        )
+        auth.invalidate_preferences(current_user.id)
+        update_preference_index(current_user.id, skills_list, companies_list, job_title, location)
         
-        db.commit()
+        resume_worker = getattr(app.state, "resume_worker", None)
+        if resume_job_id and resume_worker:
+            resume_worker.wake()
         
         return {
             "status": "success",
             "message": "Preferences saved successfully",
             "skills_extracted": skills_list,
-            "resume_parsed": resume_filename is not None
+            "resume_parsed": False,
+            # Poll GET /resume-jobs/{resume_job_id} for the skills extracted from the resume
+            "resume_job_id": resume_job_id
         }
         
     except HTTPException:
@@ -246,16 +342,41 @@ async def save_preferences(
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to save preferences: {str(e)}")
 
+@app.get("/resume-jobs/{job_id}")
+def get_resume_job(
+    job_id: int,
+    current_user: auth.UserSnapshot = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """Status of a resume parsing job started by /save-preferences"""
+    job = db.query(models.ResumeJob).filter(
+        models.ResumeJob.id == job_id,
+        models.ResumeJob.user_id == current_user.id
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Resume job not found")
+    
+    return {
+        "status": "success",
+        "job": {
+            "id": job.id,
+            "status": job.status,
+            "resume_filename": job.resume_filename,
+            "skills_extracted": job.skills.split(",") if job.skills else [],
+            "error": job.error if job.status == "failed" else None,
+            "created_at": job.created_at,
+            "finished_at": job.finished_at
+        }
+    }
+
 @app.get("/user-preferences")
 def get_user_preferences(
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.UserSnapshot = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
     """Get current user's preferences"""
     try:
-        prefs = db.query(models.UserPreference).filter(
-            models.UserPreference.user_id == current_user.id
-        ).first()
+        prefs = auth.get_preferences_snapshot(db, current_user.id)
         
         if not prefs:
             return {"status": "success", "preferences": None}
@@ -276,138 +397,272 @@ def get_user_preferences(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get preferences: {str(e)}")
 
+RESUME_MEDIA_TYPES = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+@app.get("/resume")
+def download_resume(
+    current_user: auth.UserSnapshot = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """Download the current user's uploaded resume"""
+    prefs = auth.get_preferences_snapshot(db, current_user.id)
+    store = get_resume_store()
+    if not (prefs and prefs.resume_sha256 and store.exists(prefs.resume_sha256)):
+        raise HTTPException(status_code=404, detail="No resume uploaded")
+    
+    filename = (prefs.resume_filename or "resume").replace('"', '')
+    return StreamingResponse(
+        store.iter_chunks(prefs.resume_sha256),
+        media_type=RESUME_MEDIA_TYPES.get(os.path.splitext(filename)[1].lower(), "application/octet-stream"),
+        headers={
+            "Content-Length": str(store.size(prefs.resume_sha256)),
+            "Content-Disposition": f'attachment; filename="{filename}"',
+        }
+    )
+
+def _search_context(
+    search_request: JobSearchRequest,
+    user_prefs: Optional[auth.PreferenceSnapshot],
+    resume_content: Optional[str]
+):
+    """Fill in skills and companies from saved preferences when the request omits them"""
+    skills = search_request.skills or []
+    preferred_companies = search_request.preferred_companies or []
+    
+    if user_prefs:
+        # Use user's saved skills if not provided in request
+        if not skills and user_prefs.skills:
+            skills = user_prefs.skills.split(",")
+        
+        # Use user's preferred companies if not provided in request
+        if not preferred_companies and user_prefs.preferred_companies:
+            preferred_companies = user_prefs.preferred_companies.split(",")
+    
+    # An empty resume text is no resume for matching
+    return skills, preferred_companies, resume_content or None
+
+def _queue_search_notification(
+    db: Session,
+    current_user: auth.UserSnapshot,
+    user_prefs: Optional[auth.PreferenceSnapshot],
+    search_request: JobSearchRequest,
+    jobs: List[dict]
+):
+    """Queue a WhatsApp notification if user has preferences; the notification worker sends it"""
+    if not (user_prefs and user_prefs.whatsapp_number and jobs):
+        return
+    
+    message = format_search_results_message(
+        current_user.name, search_request.job_title, search_request.location, jobs
+    )
+    # The same results for the same user are only sent once a day
+    idempotency_key = make_idempotency_key(
+        "search", current_user.id, datetime.utcnow().date().isoformat(),
+        *sorted(models.job_fingerprint(job) for job in jobs)
+    )
+    enqueue_whatsapp_message(
+        db, user_prefs.whatsapp_number, message, idempotency_key, user_id=current_user.id
+    )
+
+def _read_search_preferences(db: Session, user_id: int) -> Tuple[Optional[auth.PreferenceSnapshot], Optional[str]]:
+    """
+    The user's preferences and resume text for a search. The session's connection goes
+    back to the pool afterwards, so it isn't held while the search waits on the model.
+    """
+    try:
+        prefs = auth.get_preferences_snapshot(db, user_id)
+        resume_content = None
+        if prefs and prefs.resume_filename:
+            # Not in the cached snapshot; only searches read it
+            resume_content = db.query(models.UserPreference.resume_content).filter(
+                models.UserPreference.id == prefs.id
+            ).scalar()
+        return prefs, resume_content
+    finally:
+        db.close()
+
+def _save_search(
+    db: Session,
+    current_user: auth.UserSnapshot,
+    user_prefs: Optional[auth.PreferenceSnapshot],
+    search_request: JobSearchRequest,
+    jobs: List[dict]
+):
+    """Store the results of a search and queue its notification in one transaction"""
+    try:
+        record_search_run(db, current_user.id, search_request.job_title, search_request.location, jobs)
+        _queue_search_notification(db, current_user, user_prefs, search_request, jobs)
+        with span("db.commit"):
+            db.commit()
+    finally:
+        db.close()
+
+def _search_criteria(search_request: JobSearchRequest, skills, preferred_companies, resume_content):
+    return {
+        "job_title": search_request.job_title,
+        "location": search_request.location,
+        "skills_used": skills,
+        "companies_prioritized": preferred_companies,
+        "resume_matching": resume_content is not None
+    }
+
 @app.post("/search-jobs")
 async def search_jobs(
     search_request: JobSearchRequest,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.UserSnapshot = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
     """Enhanced job search with resume matching and company preferences"""
     try:
         # Get user preferences for additional context
-        user_prefs = db.query(models.UserPreference).filter(
-            models.UserPreference.user_id == current_user.id
-        ).first()
+        user_prefs, resume_content = await run_in_threadpool(_read_search_preferences, db, current_user.id)
         
         # Prepare search parameters
-        skills = search_request.skills or []
-        preferred_companies = search_request.preferred_companies or []
-        resume_content = None
-        
-        if user_prefs:
-            # Use user's saved skills if not provided in request
-            if not skills and user_prefs.skills:
-                skills = user_prefs.skills.split(",")
-            
-            # Use user's preferred companies if not provided in request
-            if not preferred_companies and user_prefs.preferred_companies:
-                preferred_companies = user_prefs.preferred_companies.split(",")
-            
-            # Use resume content for better matching
-            if user_prefs.resume_content:
-                resume_content = user_prefs.resume_content
+        skills, preferred_companies, resume_content = _search_context(search_request, user_prefs, resume_content)
         
         # Search for jobs
-        jobs = await run_in_threadpool(
-            search_jobs_with_resume,
+        jobs = await search_jobs_with_resume_async(
             job_title=search_request.job_title,
             location=search_request.location,
             skills=skills,
             preferred_companies=preferred_companies,
             resume_content=resume_content
         )
+        # Order results for this user locally instead of relying on the prompt alone
+        with span("rank_jobs"):
+            jobs = rank_jobs_for_user(jobs, skills, preferred_companies, resume_content)
         
         if jobs:
-            # Save job listings to database
-            for job in jobs:
-                posted_date_str = job.get('posted_date')
-                posted_date = None
-                if posted_date_str:
-                    try:
-                        posted_date = datetime.strptime(posted_date_str, '%Y-%m-%d').date()
-                    except:
-                        posted_date = datetime.now().date()
-                
-                db_job = models.JobListing(
-                    title=job['title'],
-                    company=job['company'],
-                    location=job['location'],
-                    posted_date=posted_date,
-                    description=job['description'],
-                    url=job['url'],
-                    application_url=job['application_url'],
-                    salary_range=job['salary_range'],
-                    job_type=job['job_type'],
-                    experience_level=job['experience_level']
-                )
-                db.add(db_job)
-            
-            db.commit()
-            
-            # Send WhatsApp notification if user has preferences
-            if user_prefs and user_prefs.whatsapp_number and jobs:
-                message_lines = [f"👋 Hello {current_user.name}! Welcome to Spinabot job alerts.\n"]
-                message_lines.append(f"We found {len(jobs)} jobs for '{search_request.job_title}' in {search_request.location}:\n")
-                
-                max_message_length = 1500
-                current_length = sum(len(line) for line in message_lines)
-                
-                for job in jobs[:5]:  # Send first 5 jobs via WhatsApp
-                    title = job.get('title', 'No title')
-                    company = job.get('company', 'Unknown')
-                    location = job.get('location', 'Unknown')
-                    description = job.get('description', 'No description provided')
-                    url = job.get('application_url') or job.get('url', 'No link available')
-                    
-                    if len(description) > 100:
-                        description = description[:100] + "..."
-                    
-                    job_text = (
-                        f"🔹 {title} at {company}\n"
-                        f"📍 Location: {location}\n"
-                        f"📝 {description}\n"
-                        f"🔗 Apply: {url}\n\n"
-                    )
-                    
-                    if current_length + len(job_text) > max_message_length:
-                        message_lines.append("...and more jobs available. Check the app for details.")
-                        break
-                    
-                    message_lines.append(job_text)
-                    current_length += len(job_text)
-                
-                message = "\n".join(message_lines)
-                
-                try:
-                    send_whatsapp_message(user_prefs.whatsapp_number, message)
-                except Exception as e:
-                    print(f"Failed to send WhatsApp message: {e}")
+            await run_in_threadpool(_save_search, db, current_user, user_prefs, search_request, jobs)
+            _wake_job_matcher()
         
         return {
             "status": "success",
             "results": jobs,
             "total_jobs": len(jobs),
-            "search_criteria": {
-                "job_title": search_request.job_title,
-                "location": search_request.location,
-                "skills_used": skills,
-                "companies_prioritized": preferred_companies,
-                "resume_matching": resume_content is not None
-            }
+            "search_criteria": _search_criteria(search_request, skills, preferred_companies, resume_content)
         }
         
     except Exception as e:
         print(f"Error in job search: {e}")
         raise HTTPException(status_code=500, detail=f"Job search failed: {str(e)}")
 
+@app.post("/search-jobs/stream")
+async def search_jobs_stream(
+    search_request: JobSearchRequest,
+    request: Request,
+    current_user: auth.UserSnapshot = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """
+    Streaming job search. Each job is sent as soon as the model has generated it,
+    as NDJSON by default or as Server-Sent Events when the client accepts text/event-stream.
+    Jobs therefore arrive in the model's order, unranked. The last message has type "done"
+    (or "error") and carries the search summary; its "ranking" lists the positions of the
+    streamed jobs in the order /search-jobs would return them, which is also the order saved.
+    """
+    user_prefs, resume_content = await run_in_threadpool(_read_search_preferences, db, current_user.id)
+    skills, preferred_companies, resume_content = _search_context(search_request, user_prefs, resume_content)
+    use_sse = "text/event-stream" in request.headers.get("accept", "")
+    
+    def encode(event: dict) -> str:
+        payload = json.dumps(event)
+        if use_sse:
+            return f"event: {event['type']}\ndata: {payload}\n\n"
+        return payload + "\n"
+    
+    async def job_events():
+        jobs = []
+        try:
+            async for job in stream_jobs_with_resume_async(
+                job_title=search_request.job_title,
+                location=search_request.location,
+                skills=skills,
+                preferred_companies=preferred_companies,
+                resume_content=resume_content
+            ):
+                jobs.append(job)
+                yield encode({"type": "job", "job": job})
+            
+            with span("rank_jobs"):
+                ranked = rank_jobs_for_user(jobs, skills, preferred_companies, resume_content)
+            positions = {id(job): position for position, job in enumerate(jobs)}
+            if ranked:
+                await run_in_threadpool(_save_search, db, current_user, user_prefs, search_request, ranked)
+                _wake_job_matcher()
+            
+            yield encode({
+                "type": "done",
+                "total_jobs": len(jobs),
+                "ranking": [positions[id(job)] for job in ranked],
+                "search_criteria": _search_criteria(search_request, skills, preferred_companies, resume_content)
+            })
+        except Exception as e:
+            print(f"Error in streaming job search: {e}")
+            yield encode({"type": "error", "detail": f"Job search failed: {str(e)}", "total_jobs": len(jobs)})
+    
+    media_type = "text/event-stream" if use_sse else "application/x-ndjson"
+    return StreamingResponse(job_events(), media_type=media_type)
+
+@app.get("/search-cache/stats")
+def get_search_cache_stats(admin: auth.UserSnapshot = Depends(auth.get_admin_user)):
+    """Hit/miss counters for the job search cache, single-flight layer and identity cache in this worker"""
+    return {
+        "status": "success",
+        "cache": get_search_cache().describe(),
+        "single_flight": single_flight_stats(),
+        "identity_cache": auth.identity_cache_stats()
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    """Request and span latency histograms for this worker, in the Prometheus text format"""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/admin/profile", include_in_schema=False)
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=PROFILER_MAX_SECONDS),
+    interval_ms: float = Query(PROFILER_DEFAULT_INTERVAL_MS, ge=1, le=1000),
+    allocations: bool = True,
+    format: Literal["json", "collapsed"] = "json",
+    admin: auth.UserSnapshot = Depends(auth.get_admin_user),
+    db: Session = Depends(database.get_db)
+):
+    """
+    Sample the stacks of every thread in the worker that serves this request for
+    the given time. format=collapsed returns only the stacks, ready for flamegraph.pl
+    or speedscope; json adds the top allocation sites traced during the window.
+    """
+    # Don't keep a pooled connection checked out while sampling
+    db.close()
+    try:
+        result = await run_in_threadpool(run_profile, seconds, interval_ms, allocations)
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A profile is already running in this worker")
+    if format == "collapsed":
+        return PlainTextResponse(result["collapsed_stacks"])
+    return result
+
 @app.get("/job-history")
 def get_job_history(
-    current_user: models.User = Depends(auth.get_current_user),
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    current_user: auth.UserSnapshot = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
-    """Get user's job search history"""
+    """Get user's job search history, newest first, one page at a time"""
+    try:
+        page_cursor = decode_history_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
     try:
-        jobs = db.query(models.JobListing).order_by(models.JobListing.created_at.desc()).limit(50).all()
+        rows, next_cursor = get_user_job_history(db, current_user.id, limit=limit, cursor=page_cursor)
         
         return {
             "status": "success",
@@ -424,10 +679,13 @@ def get_job_history(
                     "salary_range": job.salary_range,
                     "job_type": job.job_type,
                     "experience_level": job.experience_level,
-                    "created_at": job.created_at.isoformat()
+                    "created_at": job.created_at.isoformat() if job.created_at else None,
+                    "search_run_id": result.search_run_id,
+                    "searched_at": result.created_at.isoformat() if result.created_at else None
                 }
-                for job in jobs
-            ]
+                for result, job in rows
+            ],
+            "next_cursor": encode_history_cursor(next_cursor)
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get job history: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,172 @@
+"""
+In-memory timing histograms for requests and named spans on the hot paths,
+exported in the Prometheus text format at /metrics. Each process keeps its own,
+so with several uvicorn workers every worker has to be scraped. When
+METRICS_ENABLED is off, the middleware is not installed and span() hands back a
+shared no-op context manager.
+"""
+import bisect
+import contextlib
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "False").lower() == "true"
+# Upper bounds in seconds; Gemini calls take seconds, DB statements milliseconds
+METRICS_BUCKETS = tuple(sorted(
+    float(bound) for bound in os.getenv(
+        "METRICS_BUCKETS", "0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30"
+    ).split(",")
+))
+
+
+def _format_value(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Observation counts per bucket, plus sum and count, for each combination of label values"""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str], buckets: Sequence[float] = METRICS_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label values -> [count per bucket (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total) in sorted(series.items()):
+            labels = list(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(labels + [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str]) -> Histogram:
+        """The histogram with this name, created on first use"""
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram(name, help_text, label_names)
+            return self._histograms[name]
+
+    def render(self) -> str:
+        with self._lock:
+            histograms = list(self._histograms.values())
+        return "\n".join(line for histogram in histograms for line in histogram.render()) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "Time from receiving a request to sending the last byte of its response",
+    ("method", "route", "status")
+)
+SPAN_SECONDS = registry.histogram(
+    "span_duration_seconds", "Time spent in named sections of the request and worker paths", ("span", "outcome")
+)
+
+_NO_SPAN = contextlib.nullcontext()
+
+
+class _Span:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # GeneratorExit is a streaming consumer stopping early, not a failure
+        failed = exc_type is not None and not issubclass(exc_type, GeneratorExit)
+        SPAN_SECONDS.observe(time.perf_counter() - self.started, self.name, "error" if failed else "ok")
+        return False
+
+def span(name: str):
+    """Time a block under span_duration_seconds{span=name}; the outcome label is "error" if it raised"""
+    return _Span(name) if METRICS_ENABLED else _NO_SPAN
+
+def render_metrics() -> str:
+    return registry.render()
+
+
+class MetricsMiddleware:
+    """
+    Record every HTTP request under its route template (not the raw path, so IDs
+    in URLs don't create a series each). Streaming responses are timed to their last chunk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status: Optional[int] = None
+        recorded = False
+
+        def record(status_code: int):
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started, scope["method"], getattr(route, "path", "unmatched"), str(status_code)
+            )
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record(status)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        except Exception:
+            record(status or 500)
+            raise
+        if status is not None:
+            # The client went away before the last chunk
+            record(status)
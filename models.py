@@ -1,7 +1,17 @@
-from sqlalchemy import Column, Date, Integer, String, Text, DateTime, LargeBinary
-from sqlalchemy.sql import func
+from sqlalchemy import Boolean, Column, Date, Integer, String, Text, DateTime, Index, UniqueConstraint
+from sqlalchemy.orm import deferred
+from sqlalchemy.sql import expression, func
 from .database import Base
 import bcrypt
+import hashlib
+
+def job_fingerprint(job: dict) -> str:
+    """Content hash identifying the same posting across searches"""
+    parts = [
+        " ".join(str(job.get(field) or "").lower().split())
+        for field in ("title", "company", "location", "application_url")
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
 
 class User(Base):
     __tablename__ = "users"
@@ -27,20 +37,65 @@ class UserPreference(Base):
     __tablename__ = "user_preferences"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=False, index=True)
     job_title = Column(String(100), nullable=False)
     location = Column(String(100), nullable=False)
-    skills = Column(Text, nullable=False)  # store as comma-separated string
-    preferred_companies = Column(Text)  # store as comma-separated string
+    skills = Column(Text, nullable=False)  # comma-separated display copy of user_preference_skills
+    preferred_companies = Column(Text)  # comma-separated display copy of user_preference_companies
     whatsapp_number = Column(String(20))
     linkedin_url = Column(String(255))
     email = Column(String(100))
     resume_filename = Column(String(255))
-    resume_data = Column(LargeBinary)
-    resume_content = Column(Text)  # Extracted text from resume
+    resume_sha256 = Column(String(64))  # Key of the uploaded file in the resume store
+    resume_content = deferred(Column(Text))  # Extracted text from resume, loaded on access
+    alerts_enabled = Column(Boolean, nullable=False, default=True, server_default=expression.true())
+    alert_interval_minutes = Column(Integer)  # None means the scheduler default
+    next_alert_at = Column(DateTime(timezone=True))  # None means due now
+    last_alert_at = Column(DateTime(timezone=True))
+    alert_claim_token = Column(String(36))  # Scheduler batch currently holding the row
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        Index("ix_user_preferences_alert_due", "alerts_enabled", "next_alert_at"),
+    )
+
+class Skill(Base):
+    """A canonical skill name, shared by every preference that lists it"""
+    __tablename__ = "skills"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False, unique=True, index=True)
+
+class Company(Base):
+    """A normalized company name, shared by every preference that lists it"""
+    __tablename__ = "companies"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False, unique=True, index=True)
+
+class UserPreferenceSkill(Base):
+    __tablename__ = "user_preference_skills"
+
+    preference_id = Column(Integer, primary_key=True)
+    skill_id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_user_preference_skills_skill_user", "skill_id", "user_id"),
+    )
+
+class UserPreferenceCompany(Base):
+    __tablename__ = "user_preference_companies"
+
+    preference_id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_user_preference_companies_company_user", "company_id", "user_id"),
+    )
+
 class JobListing(Base):
     __tablename__ = "job_listings"
 
@@ -55,4 +110,106 @@ class JobListing(Base):
     salary_range = Column(String(100))
     job_type = Column(String(50))  # Full-time, Part-time, Contract, etc.
     experience_level = Column(String(50))
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    fingerprint = Column(String(64), nullable=False, unique=True, index=True)  # job_fingerprint() of the posting
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    matched_at = Column(DateTime(timezone=True))  # None until the job matcher has checked it against saved preferences
+    match_claim_token = Column(String(36))  # Job matcher batch currently holding the row
+    match_lease_until = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_job_listings_unmatched", "matched_at", "created_at"),
+    )
+
+class SentJobAlert(Base):
+    """Jobs already sent to a user by the alert scheduler or the job matcher"""
+    __tablename__ = "sent_job_alerts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    job_fingerprint = Column(String(64), nullable=False)
+    sent_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "job_fingerprint", name="uq_sent_job_alerts_user_job"),
+    )
+
+class NotificationOutbox(Base):
+    """WhatsApp messages waiting to be delivered by the notification worker"""
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer)
+    to_number = Column(String(40), nullable=False)
+    body = Column(Text, nullable=False)
+    idempotency_key = Column(String(64), nullable=False, unique=True)
+    status = Column(String(20), nullable=False, default="pending", server_default="pending")  # pending, sending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now())
+    claim_token = Column(String(36))
+    last_error = Column(Text)
+    provider_message_id = Column(String(64))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_notification_outbox_due", "status", "next_attempt_at"),
+    )
+
+class ResumeJob(Base):
+    """An uploaded resume waiting to be parsed by the resume worker"""
+    __tablename__ = "resume_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    resume_filename = Column(String(255), nullable=False)
+    resume_sha256 = Column(String(64), nullable=False)
+    status = Column(String(20), nullable=False, default="pending", server_default="pending")  # pending, processing, done, failed
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now())
+    claim_token = Column(String(36))
+    skills = Column(Text)  # Comma-separated skills extracted from the resume
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_resume_jobs_due", "status", "next_attempt_at"),
+        Index("ix_resume_jobs_user_id_id", "user_id", "id"),
+    )
+
+class SearchRun(Base):
+    """One job search made by a user"""
+    __tablename__ = "search_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    job_title = Column(String(100), nullable=False)
+    location = Column(String(100), nullable=False)
+    total_jobs = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_search_runs_user_id_id", "user_id", "id"),
+    )
+
+class UserJobResult(Base):
+    """A job listing returned to a user by a search run"""
+    __tablename__ = "user_job_results"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    search_run_id = Column(Integer, nullable=False)
+    job_listing_id = Column(Integer, nullable=False)
+    rank = Column(Integer, nullable=False)  # Position in the results shown to the user
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("search_run_id", "job_listing_id", name="uq_user_job_results_run_job"),
+        Index("ix_user_job_results_job_listing_user", "job_listing_id", "user_id"),
+    )
+
+# Serves keyset pagination of a user's history: newest run first, then the order the user saw
+Index(
+    "ix_user_job_results_history",
+    UserJobResult.user_id, UserJobResult.search_run_id.desc(), UserJobResult.rank
+)
\ No newline at end of file
@@ -0,0 +1,242 @@
+"""
+Delivery worker for the notification_outbox table. Pending messages are claimed
+in batches with a lease, sent through Twilio with per-number and global rate
+limits, and retried with exponential backoff. Delivery is at-least-once: a
+worker that dies between sending and recording a message lets its lease expire.
+
+Run with `python -m backend.notification_worker` or set NOTIFICATION_WORKER_ENABLED=True.
+"""
+import argparse
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from . import models, database
+from .metrics import span
+from .notifications import send_whatsapp_message
+
+load_dotenv()
+
+NOTIFICATION_WORKER_ENABLED = os.getenv("NOTIFICATION_WORKER_ENABLED", "False").lower() == "true"
+NOTIFICATION_BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", 100))
+NOTIFICATION_POLL_SECONDS = float(os.getenv("NOTIFICATION_POLL_SECONDS", 2))
+NOTIFICATION_SEND_CONCURRENCY = int(os.getenv("NOTIFICATION_SEND_CONCURRENCY", 8))
+NOTIFICATION_MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", 6))
+NOTIFICATION_RETRY_BASE_SECONDS = float(os.getenv("NOTIFICATION_RETRY_BASE_SECONDS", 30))
+NOTIFICATION_RETRY_MAX_SECONDS = float(os.getenv("NOTIFICATION_RETRY_MAX_SECONDS", 3600))
+NOTIFICATION_CLAIM_LEASE_SECONDS = int(os.getenv("NOTIFICATION_CLAIM_LEASE_SECONDS", 300))
+WHATSAPP_PER_NUMBER_INTERVAL_SECONDS = float(os.getenv("WHATSAPP_PER_NUMBER_INTERVAL_SECONDS", 1))
+WHATSAPP_MAX_SENDS_PER_SECOND = float(os.getenv("WHATSAPP_MAX_SENDS_PER_SECOND", 10))
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _due_filter(now: datetime):
+    # Rows stuck in "sending" belong to a worker whose lease has run out
+    return and_(
+        models.NotificationOutbox.status.in_(("pending", "sending")),
+        or_(
+            models.NotificationOutbox.next_attempt_at == None,
+            models.NotificationOutbox.next_attempt_at <= now
+        )
+    )
+
+def claim_pending_messages(
+    db: Session,
+    batch_size: int = NOTIFICATION_BATCH_SIZE,
+    lease_seconds: int = NOTIFICATION_CLAIM_LEASE_SECONDS
+) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+    """Claim up to batch_size due messages; returns the claim token and message snapshots"""
+    now = _utcnow()
+    due = _due_filter(now)
+    candidate_ids = [
+        row.id for row in db.query(models.NotificationOutbox.id)
+        .filter(due)
+        .order_by(models.NotificationOutbox.next_attempt_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    ]
+    if not candidate_ids:
+        db.rollback()
+        return None, []
+
+    token = str(uuid.uuid4())
+    db.query(models.NotificationOutbox).filter(
+        models.NotificationOutbox.id.in_(candidate_ids), due
+    ).update(
+        {
+            models.NotificationOutbox.status: "sending",
+            models.NotificationOutbox.claim_token: token,
+            models.NotificationOutbox.next_attempt_at: now + timedelta(seconds=lease_seconds),
+        },
+        synchronize_session=False
+    )
+    db.commit()
+
+    rows = db.query(
+        models.NotificationOutbox.id,
+        models.NotificationOutbox.to_number,
+        models.NotificationOutbox.body,
+        models.NotificationOutbox.attempts,
+    ).filter(
+        models.NotificationOutbox.id.in_(candidate_ids),
+        models.NotificationOutbox.claim_token == token
+    ).order_by(models.NotificationOutbox.id).all()
+    return token, [dict(row._mapping) for row in rows]
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter for the given number of failed attempts"""
+    delay = min(NOTIFICATION_RETRY_BASE_SECONDS * (2 ** (attempts - 1)), NOTIFICATION_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+def is_permanent_error(error: Exception) -> bool:
+    """Twilio 4xx errors (bad number, unsubscribed recipient) won't succeed on retry; 429 will"""
+    # Only reached after a send, which has already imported the SDK
+    from twilio.base.exceptions import TwilioRestException
+
+    status = getattr(error, "status", None)
+    return isinstance(error, TwilioRestException) and status is not None and 400 <= status < 500 and status != 429
+
+
+class RateLimiter:
+    """Minimum spacing between sends to one number, plus an overall sends-per-second cap"""
+
+    def __init__(
+        self,
+        per_number_interval: float = WHATSAPP_PER_NUMBER_INTERVAL_SECONDS,
+        max_per_second: float = WHATSAPP_MAX_SENDS_PER_SECOND
+    ):
+        self.per_number_interval = per_number_interval
+        self.global_interval = 1.0 / max_per_second if max_per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_for_number: Dict[str, float] = {}
+        self._next_global = 0.0
+
+    def reserve(self, to_number: str) -> float:
+        """Reserve a send slot and return how long to wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_global, self._next_for_number.get(to_number, 0.0))
+            self._next_global = slot + self.global_interval
+            self._next_for_number[to_number] = slot + self.per_number_interval
+            if len(self._next_for_number) > 10000:
+                # Drop numbers whose spacing has long passed
+                self._next_for_number = {n: t for n, t in self._next_for_number.items() if t > now}
+            return slot - now
+
+
+class NotificationWorker:
+    """Drains the outbox: batched claims, concurrent rate-limited sends, batched status updates"""
+
+    def __init__(
+        self,
+        batch_size: int = NOTIFICATION_BATCH_SIZE,
+        send_concurrency: int = NOTIFICATION_SEND_CONCURRENCY,
+        poll_seconds: float = NOTIFICATION_POLL_SECONDS
+    ):
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.rate_limiter = RateLimiter()
+        self._executor = ThreadPoolExecutor(max_workers=send_concurrency, thread_name_prefix="whatsapp-send")
+        self._stop = threading.Event()
+
+    def _send(self, message: Dict[str, Any]) -> Tuple[Optional[str], Optional[Exception]]:
+        wait = self.rate_limiter.reserve(message["to_number"])
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            with span("twilio.send"):
+                return send_whatsapp_message(message["to_number"], message["body"]), None
+        except Exception as e:
+            return None, e
+
+    def _record_results(self, token: str, results: List[Tuple[Dict[str, Any], Optional[str], Optional[Exception]]]):
+        now = _utcnow()
+        updates = []
+        for message, sid, error in results:
+            attempts = message["attempts"] + 1
+            if error is None:
+                update = {"status": "sent", "sent_at": now, "provider_message_id": sid, "last_error": None}
+            elif is_permanent_error(error) or attempts >= NOTIFICATION_MAX_ATTEMPTS:
+                update = {"status": "failed", "last_error": str(error)[:1000]}
+            else:
+                update = {
+                    "status": "pending",
+                    "last_error": str(error)[:1000],
+                    "next_attempt_at": now + timedelta(seconds=retry_delay(attempts)),
+                }
+            update.update({"id": message["id"], "attempts": attempts, "claim_token": None})
+            updates.append(update)
+
+        with database.SessionLocal() as db:
+            # Only touch rows this batch still owns
+            owned = {
+                row.id for row in db.query(models.NotificationOutbox.id).filter(
+                    models.NotificationOutbox.id.in_([u["id"] for u in updates]),
+                    models.NotificationOutbox.claim_token == token
+                )
+            }
+            db.bulk_update_mappings(models.NotificationOutbox, [u for u in updates if u["id"] in owned])
+            db.commit()
+
+    def run_once(self) -> Dict[str, int]:
+        """Claim and deliver one batch of due messages"""
+        with database.SessionLocal() as db:
+            token, batch = claim_pending_messages(db, self.batch_size)
+        if not batch:
+            return {"claimed": 0, "sent": 0, "failed": 0}
+
+        outcomes = list(self._executor.map(self._send, batch))
+        results = [(message, sid, error) for message, (sid, error) in zip(batch, outcomes)]
+        self._record_results(token, results)
+
+        failed = sum(1 for _, _, error in results if error is not None)
+        for message, _, error in results:
+            if error is not None:
+                print(f"Failed to send WhatsApp message {message['id']}: {error}")
+        return {"claimed": len(batch), "sent": len(batch) - failed, "failed": failed}
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            try:
+                stats = self.run_once()
+            except Exception as e:
+                print(f"Notification worker error: {e}")
+                stats = {"claimed": 0}
+            # Keep draining while there is a backlog; otherwise poll
+            if stats["claimed"] < self.batch_size:
+                self._stop.wait(self.poll_seconds)
+
+    def start(self) -> threading.Thread:
+        """Run the worker loop in a background daemon thread"""
+        thread = threading.Thread(target=self.run_forever, name="notification-worker", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+        self._executor.shutdown(wait=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Deliver queued WhatsApp notifications")
+    parser.add_argument("--once", action="store_true", help="Deliver one batch and exit")
+    args = parser.parse_args()
+
+    worker = NotificationWorker()
+    if args.once:
+        print(worker.run_once())
+    else:
+        worker.run_forever()
+
+if __name__ == "__main__":
+    main()
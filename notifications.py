@@ -0,0 +1,143 @@
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import hashlib
+import os
+import threading
+from dotenv import load_dotenv
+from datetime import datetime, timezone
+from typing import List, Optional
+from . import models
+
+load_dotenv()
+
+# Twilio WhatsApp Config (Sandbox)
+ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
+AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
+TWILIO_WHATSAPP_NUMBER = os.getenv("TWILIO_WHATSAPP_FROM")
+# Another endpoint for the Twilio REST API, e.g. the stand-in in benchmarks/fake_services.py
+TWILIO_BASE_URL = os.getenv("TWILIO_BASE_URL")
+
+# WhatsApp messages are kept well under Twilio's 1600 character limit
+MAX_MESSAGE_LENGTH = 1500
+
+_twilio_client = None
+_twilio_client_lock = threading.Lock()
+
+def get_twilio_client():
+    """Shared Twilio client for this process, created (and the SDK imported) on first send"""
+    global _twilio_client
+    if _twilio_client is None:
+        with _twilio_client_lock:
+            if _twilio_client is None:
+                from twilio.rest import Client
+                twilio_client = Client(ACCOUNT_SID, AUTH_TOKEN)
+                if TWILIO_BASE_URL:
+                    twilio_client.api.base_url = TWILIO_BASE_URL
+                _twilio_client = twilio_client
+    return _twilio_client
+
+def send_whatsapp_message(to_number: str, body_text: str):
+    if not to_number.startswith("whatsapp:"):
+        to_number = f"whatsapp:{to_number}"
+    message = get_twilio_client().messages.create(
+        body=body_text,
+        from_=TWILIO_WHATSAPP_NUMBER,
+        to=to_number
+    )
+    return message.sid
+
+def make_idempotency_key(*parts) -> str:
+    """Stable key so the same logical notification is only queued once"""
+    return hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+def enqueue_whatsapp_message(
+    db: Session,
+    to_number: str,
+    body_text: str,
+    idempotency_key: str,
+    user_id: Optional[int] = None
+) -> bool:
+    """
+    Add a message to the outbox in the caller's transaction; the notification worker delivers it.
+    Returns False if a message with the same idempotency key was already queued.
+    """
+    if db.query(models.NotificationOutbox.id).filter(
+        models.NotificationOutbox.idempotency_key == idempotency_key
+    ).first():
+        return False
+    
+    try:
+        # Savepoint, so losing a race on the unique key doesn't roll back the caller's work
+        with db.begin_nested():
+            db.add(models.NotificationOutbox(
+                user_id=user_id,
+                to_number=to_number,
+                body=body_text,
+                idempotency_key=idempotency_key,
+                status="pending",
+                attempts=0,
+                next_attempt_at=datetime.now(timezone.utc)
+            ))
+    except IntegrityError:
+        return False
+    return True
+
+def format_jobs_message(header_lines: List[str], jobs: List[dict], max_jobs: int = 5) -> str:
+    """Build a WhatsApp message listing the first few jobs after the given header lines"""
+    message_lines = list(header_lines)
+    current_length = sum(len(line) for line in message_lines)
+    
+    for job in jobs[:max_jobs]:
+        title = job.get('title', 'No title')
+        company = job.get('company', 'Unknown')
+        location = job.get('location', 'Unknown')
+        description = job.get('description', 'No description provided')
+        url = job.get('application_url') or job.get('url', 'No link available')
+        
+        if len(description) > 100:
+            description = description[:100] + "..."
+        
+        job_text = (
+            f"🔹 {title} at {company}\n"
+            f"📍 Location: {location}\n"
+            f"📝 {description}\n"
+            f"🔗 Apply: {url}\n\n"
+        )
+        
+        if current_length + len(job_text) > MAX_MESSAGE_LENGTH:
+            message_lines.append("...and more jobs available. Check the app for details.")
+            break
+        
+        message_lines.append(job_text)
+        current_length += len(job_text)
+    
+    return "\n".join(message_lines)
+
+def format_search_results_message(user_name: str, job_title: str, location: str, jobs: List[dict]) -> str:
+    """Message sent after a user runs a search"""
+    return format_jobs_message(
+        [
+            f"👋 Hello {user_name}! Welcome to Spinabot job alerts.\n",
+            f"We found {len(jobs)} jobs for '{job_title}' in {location}:\n",
+        ],
+        jobs
+    )
+
+def format_alert_digest_message(user_name: str, job_title: str, location: str, jobs: List[dict]) -> str:
+    """Message sent by the alert scheduler with jobs the user has not been sent before"""
+    return format_jobs_message(
+        [
+            f"👋 Hello {user_name}! Here is your Spinabot job alert.\n",
+            f"{len(jobs)} new jobs for '{job_title}' in {location} since your last alert:\n",
+        ],
+        jobs
+    )
+
+def format_job_match_message(user_name: str, job_title: str, location: str, jobs: List[dict]) -> str:
+    """Message sent by the job matcher when jobs found by other searches fit the user's preferences"""
+    return format_jobs_message(
+        [
+            f"👋 Hello {user_name}! New jobs just came in for '{job_title}' in {location}:\n",
+        ],
+        jobs
+    )
@@ -0,0 +1,270 @@
+"""
+Normalized skills and companies for user preferences, plus an in-memory
+inverted index from each skill and company to the users who listed it, so
+"which users want Kubernetes jobs at Stripe" is a couple of set lookups.
+Users are also grouped by the words of their job title and location, which
+lets the job matcher find everyone a new posting could suit.
+
+The database tables are the source of truth. Each process keeps its own index,
+updates it for writes it makes and reloads it periodically to pick up writes
+made elsewhere.
+"""
+import os
+import threading
+import time
+from itertools import combinations
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+from . import models, database
+from .job_ranking import tokenize
+from .query_planner import LOCATION_ALIASES, canonical_location, canonical_title
+from .search_cache import normalize_text
+from .skill_extractor import canonical_skill, get_skill_matcher
+
+load_dotenv()
+
+PREFERENCE_INDEX_REFRESH_SECONDS = int(os.getenv("PREFERENCE_INDEX_REFRESH_SECONDS", 300))
+
+# Posting words looked at when matching; a user's title or location words must all be among them
+MATCH_MAX_TITLE_WORDS = 8
+MATCH_MAX_LOCATION_WORDS = 6
+
+Terms = FrozenSet[str]
+
+def skill_key(name: Optional[str]) -> str:
+    return canonical_skill(name)[:100]
+
+def company_key(name: Optional[str]) -> str:
+    return normalize_text(name)[:100]
+
+def title_terms(job_title: Optional[str]) -> Terms:
+    return frozenset(tokenize(canonical_title(job_title or "")))
+
+def location_terms(location: Optional[str]) -> Terms:
+    words = canonical_location(location or "").split()
+    return frozenset(term for word in words for term in LOCATION_ALIASES.get(word, word).split())
+
+def _subsets(terms: Iterable[str], limit: int, include_empty: bool = False):
+    terms = list(dict.fromkeys(terms))[:limit]
+    for size in range(0 if include_empty else 1, len(terms) + 1):
+        for subset in combinations(terms, size):
+            yield frozenset(subset)
+
+def _keys(values: Optional[Iterable[str]], key) -> Set[str]:
+    keys = {key(value) for value in values or []}
+    keys.discard("")
+    return keys
+
+def _ensure_names(db: Session, model, names: Set[str]) -> Dict[str, int]:
+    """Ids for the given names, creating rows for names not seen before"""
+    if not names:
+        return {}
+    database.insert_ignoring_conflicts(db, model, [{"name": name} for name in sorted(names)], "name")
+    return dict(db.query(model.name, model.id).filter(model.name.in_(names)).all())
+
+def sync_preference_terms(
+    db: Session,
+    preference_id: int,
+    user_id: int,
+    skills: Optional[Iterable[str]],
+    companies: Optional[Iterable[str]]
+):
+    """Replace a preference's skill and company links, in the caller's transaction"""
+    skill_ids = _ensure_names(db, models.Skill, _keys(skills, skill_key))
+    company_ids = _ensure_names(db, models.Company, _keys(companies, company_key))
+
+    db.query(models.UserPreferenceSkill).filter(
+        models.UserPreferenceSkill.preference_id == preference_id
+    ).delete(synchronize_session=False)
+    db.query(models.UserPreferenceCompany).filter(
+        models.UserPreferenceCompany.preference_id == preference_id
+    ).delete(synchronize_session=False)
+
+    if skill_ids:
+        db.execute(models.UserPreferenceSkill.__table__.insert(), [
+            {"preference_id": preference_id, "skill_id": skill_id, "user_id": user_id}
+            for skill_id in skill_ids.values()
+        ])
+    if company_ids:
+        db.execute(models.UserPreferenceCompany.__table__.insert(), [
+            {"preference_id": preference_id, "company_id": company_id, "user_id": user_id}
+            for company_id in company_ids.values()
+        ])
+
+
+class PreferenceIndex:
+    """Skill and company postings lists of user ids, and users grouped by title and location words"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._skills: Dict[str, Set[int]] = {}
+        self._companies: Dict[str, Set[int]] = {}
+        self._user_skills: Dict[int, Set[str]] = {}
+        self._user_companies: Dict[int, Set[str]] = {}
+        # title words -> location words -> users
+        self._titles: Dict[Terms, Dict[Terms, Set[int]]] = {}
+        self._user_titles: Dict[int, Tuple[Terms, Terms]] = {}
+        self.loaded_at: Optional[float] = None
+
+    def load(self, db: Session):
+        """Rebuild the index from the association tables"""
+        user_skills: Dict[int, Set[str]] = {}
+        for user_id, name in db.query(models.UserPreferenceSkill.user_id, models.Skill.name).join(
+            models.Skill, models.Skill.id == models.UserPreferenceSkill.skill_id
+        ):
+            user_skills.setdefault(user_id, set()).add(name)
+        user_companies: Dict[int, Set[str]] = {}
+        for user_id, name in db.query(models.UserPreferenceCompany.user_id, models.Company.name).join(
+            models.Company, models.Company.id == models.UserPreferenceCompany.company_id
+        ):
+            user_companies.setdefault(user_id, set()).add(name)
+        titles: Dict[Terms, Dict[Terms, Set[int]]] = {}
+        user_titles: Dict[int, Tuple[Terms, Terms]] = {}
+        for user_id, job_title, location in db.query(
+            models.UserPreference.user_id, models.UserPreference.job_title, models.UserPreference.location
+        ):
+            _group(titles, user_titles, user_id, job_title, location)
+
+        skills = _invert(user_skills)
+        companies = _invert(user_companies)
+        with self._lock:
+            self._skills, self._companies = skills, companies
+            self._user_skills, self._user_companies = user_skills, user_companies
+            self._titles, self._user_titles = titles, user_titles
+            self.loaded_at = time.monotonic()
+
+    def update_user(
+        self,
+        user_id: int,
+        skills: Optional[Iterable[str]],
+        companies: Optional[Iterable[str]],
+        job_title: Optional[str] = None,
+        location: Optional[str] = None
+    ):
+        """Apply a user's new preferences without a reload"""
+        with self._lock:
+            _repost(self._skills, self._user_skills, user_id, _keys(skills, skill_key))
+            _repost(self._companies, self._user_companies, user_id, _keys(companies, company_key))
+            _ungroup(self._titles, self._user_titles, user_id)
+            _group(self._titles, self._user_titles, user_id, job_title, location)
+
+    def remove_user(self, user_id: int):
+        self.update_user(user_id, [], [])
+
+    def users_for_posting(self, title: Optional[str], location: Optional[str], skills: Iterable[str]) -> Set[int]:
+        """
+        Users a job posting could suit: every word of their job title and location
+        appears in the posting's, and they share a skill with it unless none of
+        their skills are in the taxonomy. Lookups are one per subset of the
+        posting's title words (and location words, for titles that have users).
+        """
+        posting_locations = list(_subsets(location_terms(location), MATCH_MAX_LOCATION_WORDS, include_empty=True))
+        job_skills = set(skills)
+        taxonomy = set(get_skill_matcher().skill_ids)
+        users: Set[int] = set()
+        with self._lock:
+            for title_key in _subsets(title_terms(title), MATCH_MAX_TITLE_WORDS):
+                locations = self._titles.get(title_key)
+                if not locations:
+                    continue
+                for location_key in posting_locations:
+                    users.update(locations.get(location_key, ()))
+            return {
+                user_id for user_id in users
+                if not (self._user_skills.get(user_id, set()) & taxonomy)
+                or self._user_skills[user_id] & job_skills
+            }
+
+    def users_with_skills(self, skills: Iterable[str]) -> Set[int]:
+        """Users who listed any of the skills"""
+        with self._lock:
+            return set().union(*(self._skills.get(key, ()) for key in _keys(skills, skill_key)))
+
+    def users_with_companies(self, companies: Iterable[str]) -> Set[int]:
+        """Users who listed any of the companies"""
+        with self._lock:
+            return set().union(*(self._companies.get(key, ()) for key in _keys(companies, company_key)))
+
+    def users_for(self, skills: Optional[Iterable[str]] = None, companies: Optional[Iterable[str]] = None) -> Set[int]:
+        """Users matching any of the skills and, when given, any of the companies"""
+        users = self.users_with_skills(skills) if skills is not None else None
+        if companies is not None:
+            company_users = self.users_with_companies(companies)
+            users = company_users if users is None else users & company_users
+        return users or set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "skills": len(self._skills),
+                "companies": len(self._companies),
+                "titles": len(self._titles),
+                "users": len(self._user_skills.keys() | self._user_companies.keys() | self._user_titles.keys()),
+            }
+
+def _invert(user_terms: Dict[int, Set[str]]) -> Dict[str, Set[int]]:
+    postings: Dict[str, Set[int]] = {}
+    for user_id, terms in user_terms.items():
+        for term in terms:
+            postings.setdefault(term, set()).add(user_id)
+    return postings
+
+def _repost(postings: Dict[str, Set[int]], user_terms: Dict[int, Set[str]], user_id: int, terms: Set[str]):
+    for term in user_terms.pop(user_id, set()) - terms:
+        users = postings.get(term)
+        if users is not None:
+            users.discard(user_id)
+            if not users:
+                del postings[term]
+    for term in terms:
+        postings.setdefault(term, set()).add(user_id)
+    if terms:
+        user_terms[user_id] = terms
+
+def _group(titles, user_titles, user_id: int, job_title: Optional[str], location: Optional[str]):
+    # Users without title words would match every posting, so they are left out
+    key = (title_terms(job_title), location_terms(location))
+    if key[0]:
+        titles.setdefault(key[0], {}).setdefault(key[1], set()).add(user_id)
+        user_titles[user_id] = key
+
+def _ungroup(titles, user_titles, user_id: int):
+    key = user_titles.pop(user_id, None)
+    if key is None:
+        return
+    locations = titles.get(key[0], {})
+    users = locations.get(key[1])
+    if users is not None:
+        users.discard(user_id)
+        if not users:
+            del locations[key[1]]
+    if not locations:
+        titles.pop(key[0], None)
+
+_preference_index = PreferenceIndex()
+_preference_index_lock = threading.Lock()
+
+def get_preference_index() -> PreferenceIndex:
+    """This process's index, loaded on first use and reloaded every PREFERENCE_INDEX_REFRESH_SECONDS"""
+    index = _preference_index
+    loaded_at = index.loaded_at
+    if loaded_at is None or time.monotonic() - loaded_at > PREFERENCE_INDEX_REFRESH_SECONDS:
+        with _preference_index_lock:
+            if index.loaded_at == loaded_at:
+                with database.SessionLocal() as db:
+                    index.load(db)
+    return index
+
+def update_preference_index(
+    user_id: int,
+    skills: Optional[Iterable[str]],
+    companies: Optional[Iterable[str]],
+    job_title: Optional[str] = None,
+    location: Optional[str] = None
+):
+    """Apply a committed preference change to this process's index, if it has been loaded"""
+    if _preference_index.loaded_at is not None:
+        _preference_index.update_user(user_id, skills, companies, job_title, location)
@@ -0,0 +1,160 @@
+"""
+On-demand statistical profiler for a live worker. A sampling thread reads every
+thread's stack from sys._current_frames() at a fixed interval for a bounded time,
+and the counts come back as collapsed stacks ("frame;frame;frame count", the
+input of flamegraph.pl and speedscope). Allocations are traced with tracemalloc
+for the same window. Nothing runs and nothing is traced between profiles.
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", 60))
+PROFILER_DEFAULT_INTERVAL_MS = float(os.getenv("PROFILER_DEFAULT_INTERVAL_MS", 5))
+# Frames kept per allocation traceback; more frames cost more memory while tracing
+PROFILER_ALLOCATION_FRAMES = int(os.getenv("PROFILER_ALLOCATION_FRAMES", 10))
+MAX_STACK_DEPTH = 128
+APP_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Another profile is already running in this process"""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    name = getattr(code, "co_qualname", code.co_name)
+    # Separators of the collapsed format can't appear inside a frame
+    return f"{module}.{name}:{frame.f_lineno}".replace(";", ":").replace(" ", "_")
+
+def _collapse(frame, thread_name: str) -> str:
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name.replace(";", ":").replace(" ", "_"))
+    return ";".join(reversed(labels))
+
+
+class SamplingProfiler:
+    """Samples the stacks of every other thread in this process"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+    def sample(self, own_ident: int):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            self.stacks[_collapse(frame, names.get(ident, f"thread-{ident}"))] += 1
+        self.samples += 1
+
+    def run(self, duration: float):
+        own_ident = threading.get_ident()
+        deadline = time.perf_counter() + duration
+        next_sample = time.perf_counter()
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if now < next_sample:
+                time.sleep(min(next_sample - now, deadline - now))
+                continue
+            self.sample(own_ident)
+            next_sample += self.interval
+            # Don't burst to catch up after a long GIL wait
+            next_sample = max(next_sample, time.perf_counter())
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _top_allocations(snapshot: tracemalloc.Snapshot, limit: int) -> Dict[str, List[Dict[str, Any]]]:
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__, all_frames=True),
+    ])
+    stats = snapshot.statistics("traceback")
+    top = [
+        {
+            "size_bytes": stat.size,
+            "count": stat.count,
+            # Innermost call last
+            "traceback": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+        }
+        for stat in stats[:limit]
+    ]
+    # The same allocations charged to the innermost line of this app that led to them,
+    # e.g. an allocation inside the regex or json modules to the parse_jobs_response line calling it
+    app_sites: Dict[str, List[int]] = {}
+    for stat in stats:
+        for frame in reversed(stat.traceback):
+            if frame.filename.startswith(APP_DIR):
+                site = app_sites.setdefault(f"{os.path.relpath(frame.filename, APP_DIR)}:{frame.lineno}", [0, 0])
+                site[0] += stat.size
+                site[1] += stat.count
+                break
+    by_app_site = [
+        {"site": site, "size_bytes": size, "count": count}
+        for site, (size, count) in sorted(app_sites.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+    ]
+    return {"top": top, "by_app_site": by_app_site}
+
+def run_profile(
+    seconds: float,
+    interval_ms: float = PROFILER_DEFAULT_INTERVAL_MS,
+    allocations: bool = True,
+    allocation_limit: int = 25
+) -> Dict[str, Any]:
+    """
+    Profile this process for the given time (capped at PROFILER_MAX_SECONDS) and
+    block until done, so call it from a worker thread. Allocations are the ones
+    made during the window that are still alive at its end, grouped by traceback.
+    Raises ProfilerBusy if a profile is already running.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy()
+    try:
+        seconds = min(max(seconds, 0.1), PROFILER_MAX_SECONDS)
+        profiler = SamplingProfiler(max(interval_ms, 1) / 1000)
+        started_tracing = allocations and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(PROFILER_ALLOCATION_FRAMES)
+        snapshot: Optional[tracemalloc.Snapshot] = None
+        peak = None
+        started = time.perf_counter()
+        try:
+            profiler.run(seconds)
+            if allocations:
+                snapshot = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+
+        result: Dict[str, Any] = {
+            "pid": os.getpid(),
+            "duration_seconds": round(time.perf_counter() - started, 3),
+            "interval_ms": profiler.interval * 1000,
+            "samples": profiler.samples,
+            "collapsed_stacks": profiler.collapsed(),
+        }
+        if snapshot is not None:
+            result["allocations"] = {"peak_traced_bytes": peak, **_top_allocations(snapshot, allocation_limit)}
+        return result
+    finally:
+        _profile_lock.release()
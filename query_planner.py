@@ -0,0 +1,71 @@
+import re
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from .search_cache import normalize_text
+
+# Common spellings that should land in the same query bucket
+TITLE_ALIASES = {
+    "sr": "senior",
+    "jr": "junior",
+    "swe": "software engineer",
+    "sde": "software engineer",
+    "dev": "developer",
+    "eng": "engineer",
+    "mgr": "manager",
+    "ml": "machine learning",
+    "ai": "artificial intelligence",
+}
+
+LOCATION_ALIASES = {
+    "bengaluru": "bangalore",
+    "nyc": "new york",
+    "new york city": "new york",
+    "sf": "san francisco",
+    "bay area": "san francisco",
+    "wfh": "remote",
+    "work from home": "remote",
+    "anywhere": "remote",
+}
+
+_PUNCTUATION = re.compile(r"[^\w\s+#]")
+
+def canonical_title(job_title: str) -> str:
+    words = _PUNCTUATION.sub(" ", normalize_text(job_title)).split()
+    return " ".join(TITLE_ALIASES.get(word, word) for word in words)
+
+def canonical_location(location: str) -> str:
+    text = " ".join(_PUNCTUATION.sub(" ", normalize_text(location)).split())
+    return LOCATION_ALIASES.get(text, text)
+
+def canonical_query(job_title: str, location: str) -> Tuple[str, str]:
+    """Bucket key shared by preferences that should run the same search"""
+    return canonical_title(job_title), canonical_location(location)
+
+
+class QueryBucket:
+    """One search shared by every preference with an equivalent title and location"""
+
+    def __init__(self, key: Tuple[str, str]):
+        self.key = key
+        self.members: List[Dict[str, Any]] = []
+
+    @property
+    def job_title(self) -> str:
+        # Search with the most common spelling users actually typed
+        return Counter(m["job_title"].strip() for m in self.members).most_common(1)[0][0]
+
+    @property
+    def location(self) -> str:
+        return Counter(m["location"].strip() for m in self.members).most_common(1)[0][0]
+
+def plan_query_buckets(preferences: List[Dict[str, Any]]) -> List[QueryBucket]:
+    """Group preference snapshots into canonical query buckets, largest first"""
+    buckets: Dict[Tuple[str, str], QueryBucket] = {}
+    for pref in preferences:
+        key = canonical_query(pref["job_title"], pref["location"])
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = QueryBucket(key)
+        bucket.members.append(pref)
+    return sorted(buckets.values(), key=lambda b: len(b.members), reverse=True)
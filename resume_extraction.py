@@ -0,0 +1,183 @@
+"""
+Resume text extraction off the event loop. Documents are parsed in a bounded
+process pool; a PDF's pages are split across the workers and joined in order.
+Every task runs under a CPU-time limit and a wall-clock timeout that starts
+once a worker is free for it, so a pathological file costs one worker process,
+not the API, and a burst of large files doesn't time out the ones queued behind them.
+"""
+import asyncio
+import math
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+
+from .metrics import span
+from .resume_parser import (
+    ResumeSource, build_parsed_resume, count_pdf_pages, extract_pdf_pages, extract_text_from_docx,
+    get_resume_cache, resume_cache_key
+)
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; limits are then wall-clock only
+    resource = None
+
+load_dotenv()
+
+RESUME_POOL_WORKERS = int(os.getenv("RESUME_POOL_WORKERS", min(4, os.cpu_count() or 1)))
+RESUME_MAX_CONCURRENT_DOCUMENTS = int(os.getenv("RESUME_MAX_CONCURRENT_DOCUMENTS", 8))
+RESUME_MIN_PAGES_PER_TASK = int(os.getenv("RESUME_MIN_PAGES_PER_TASK", 4))
+RESUME_PARSE_TIMEOUT_SECONDS = float(os.getenv("RESUME_PARSE_TIMEOUT_SECONDS", 30))
+RESUME_PARSE_CPU_SECONDS = int(os.getenv("RESUME_PARSE_CPU_SECONDS", 30))
+RESUME_PARSE_MEMORY_MB = int(os.getenv("RESUME_PARSE_MEMORY_MB", 1024))
+
+
+class ResumeExtractionUnavailable(Exception):
+    """
+    Extraction timed out or lost its worker process. Not necessarily the document's
+    fault (another document can break the pool), so worth retrying.
+    """
+
+
+def _init_worker(memory_mb: int):
+    if resource is not None and memory_mb > 0:
+        limit = memory_mb * 1024 * 1024
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (limit if hard == resource.RLIM_INFINITY else min(limit, hard), hard))
+
+def _run_limited(cpu_seconds: int, func: Callable, *args) -> Any:
+    # RLIMIT_CPU counts the whole process, so allow this task cpu_seconds beyond what is used so far;
+    # a task that exceeds it gets SIGXCPU and takes down only its worker
+    if resource is not None and cpu_seconds > 0:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        soft = math.ceil(usage.ru_utime + usage.ru_stime) + cpu_seconds
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        if hard == resource.RLIM_INFINITY or soft < hard:
+            resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    return func(*args)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def get_resume_pool() -> ProcessPoolExecutor:
+    """Shared extraction pool for this process, started on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # Workers come from a fork server, not a fork of this multi-threaded process
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                _pool = ProcessPoolExecutor(
+                    max_workers=RESUME_POOL_WORKERS,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(RESUME_PARSE_MEMORY_MB,)
+                )
+    return _pool
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    # A worker that hit a limit breaks the whole executor; the next call starts a fresh one
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_resume_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+# asyncio primitives only work on the loop that first used them, so each running loop gets its own.
+# Workers are therefore counted per loop; the API and its resume worker share one loop.
+_document_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+_worker_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+def _loop_semaphore(semaphores: weakref.WeakKeyDictionary, size: int) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = semaphores.get(loop)
+    if semaphore is None:
+        semaphore = semaphores[loop] = asyncio.Semaphore(size)
+    return semaphore
+
+async def _run_task(pool: ProcessPoolExecutor, func: Callable, *args) -> Any:
+    """Submit one task once a worker is free for it, and time it out from then on"""
+    loop = asyncio.get_running_loop()
+    workers = _loop_semaphore(_worker_slots, RESUME_POOL_WORKERS)
+    await workers.acquire()
+    try:
+        future = pool.submit(_run_limited, RESUME_PARSE_CPU_SECONDS, func, *args)
+    except BaseException:
+        workers.release()
+        raise
+
+    def release(_):
+        # A timed-out task keeps its worker until its CPU limit ends it, so its slot stays taken until then
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(workers.release)
+
+    future.add_done_callback(release)
+    return await asyncio.wait_for(asyncio.wrap_future(future), RESUME_PARSE_TIMEOUT_SECONDS)
+
+async def _extract_text(pool: ProcessPoolExecutor, file_data: ResumeSource, extension: str) -> str:
+    def submit(func, *args):
+        return _run_task(pool, func, *args)
+
+    if extension == ".docx":
+        return await submit(extract_text_from_docx, file_data)
+
+    page_count = await submit(count_pdf_pages, file_data)
+    # At most one task per worker; each one re-opens the document
+    pages_per_task = max(RESUME_MIN_PAGES_PER_TASK, math.ceil(page_count / RESUME_POOL_WORKERS))
+    chunks = await asyncio.gather(*(
+        submit(extract_pdf_pages, file_data, start, min(start + pages_per_task, page_count))
+        for start in range(0, page_count, pages_per_task)
+    ))
+    return "\n".join(page for chunk in chunks for page in chunk).strip()
+
+async def extract_resume_text(file_data: ResumeSource, filename: str) -> str:
+    """
+    Extract a PDF or DOCX resume's text in the process pool. Pass a file path
+    rather than bytes so the document is not pickled to every worker.
+    """
+    extension = os.path.splitext(filename.lower())[1]
+    if extension not in (".pdf", ".docx"):
+        raise ValueError("Unsupported file format. Please upload PDF or DOCX files.")
+
+    async with _loop_semaphore(_document_slots, RESUME_MAX_CONCURRENT_DOCUMENTS):
+        pool = get_resume_pool()
+        try:
+            return await _extract_text(pool, file_data, extension)
+        except asyncio.TimeoutError:
+            raise ResumeExtractionUnavailable("Resume took too long to process. Please upload a simpler file.")
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            raise ResumeExtractionUnavailable("Resume could not be processed. Please upload a different file.")
+        except Exception as e:
+            print(f"Error extracting text from {extension[1:].upper()}: {e}")
+            return ""
+
+async def parse_resume_async(file_data: ResumeSource, filename: str, digest: Optional[str] = None) -> dict:
+    """Async parse_resume: cached result, or extraction in the process pool"""
+    cache = get_resume_cache()
+    key = resume_cache_key(file_data, filename, digest)
+    parsed = await run_in_threadpool(cache.get, key) if cache.blocking else cache.get(key)
+    if parsed is None:
+        with span("resume.parse"):
+            text = await extract_resume_text(file_data, filename)
+            parsed = await run_in_threadpool(build_parsed_resume, text)
+        if cache.blocking:
+            await run_in_threadpool(cache.set, key, parsed)
+        else:
+            cache.set(key, parsed)
+    return parsed
@@ -1,60 +1,72 @@
-import PyPDF2
-import docx
+import hashlib
 import io
+import os
 import re
-from typing import Optional
+import threading
+from typing import BinaryIO, Optional, Union
 
-def extract_text_from_pdf(pdf_data: bytes) -> str:
+from .search_cache import BaseCache, create_cache
+from .skill_extractor import extract_skills, get_skill_matcher
+
+# Bump whenever extraction or skill matching changes so cached results are re-parsed
+PARSER_VERSION = 2
+
+RESUME_CACHE_BACKEND = os.getenv("RESUME_CACHE_BACKEND", "memory")  # memory, sqlite or none
+RESUME_CACHE_TTL_SECONDS = int(os.getenv("RESUME_CACHE_TTL_SECONDS", 30 * 24 * 3600))
+RESUME_CACHE_MAX_ENTRIES = int(os.getenv("RESUME_CACHE_MAX_ENTRIES", 500))
+RESUME_CACHE_PATH = os.getenv("RESUME_CACHE_PATH", "./resume_cache.db")
+
+# A resume is either its bytes or the path of a file holding them, e.g. in the resume store
+ResumeSource = Union[bytes, str]
+
+def _open_source(source: ResumeSource) -> BinaryIO:
+    # Paths are read straight from disk, so workers never receive a copy of the document
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    return open(source, "rb")
+
+def _source_digest(source: ResumeSource) -> str:
+    sha256 = hashlib.sha256()
+    with _open_source(source) as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def count_pdf_pages(pdf_data: ResumeSource) -> int:
+    import PyPDF2
+    with _open_source(pdf_data) as pdf_file:
+        return len(PyPDF2.PdfReader(pdf_file).pages)
+
+def extract_pdf_pages(pdf_data: ResumeSource, start: int = 0, stop: Optional[int] = None) -> list[str]:
+    """Text of pages start..stop, so large documents can be split across workers"""
+    # Parsing libraries are imported on first use, keeping them out of API startup
+    import PyPDF2
+    with _open_source(pdf_data) as pdf_file:
+        pdf_reader = PyPDF2.PdfReader(pdf_file)
+        return [page.extract_text() or "" for page in pdf_reader.pages[start:stop]]
+
+def extract_text_from_pdf(pdf_data: ResumeSource) -> str:
     """Extract text from PDF file"""
     try:
-        pdf_file = io.BytesIO(pdf_data)
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text.strip()
+        return "\n".join(extract_pdf_pages(pdf_data)).strip()
     except Exception as e:
         print(f"Error extracting text from PDF: {e}")
         return ""
 
-def extract_text_from_docx(docx_data: bytes) -> str:
+def extract_text_from_docx(docx_data: ResumeSource) -> str:
     """Extract text from DOCX file"""
     try:
-        docx_file = io.BytesIO(docx_data)
-        doc = docx.Document(docx_file)
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text.strip()
+        import docx
+        with _open_source(docx_data) as docx_file:
+            doc = docx.Document(docx_file)
+        return "\n".join(paragraph.text for paragraph in doc.paragraphs).strip()
     except Exception as e:
         print(f"Error extracting text from DOCX: {e}")
         return ""
 
 def extract_skills_from_resume(resume_text: str) -> list[str]:
-    """Extract skills from resume text"""
-    # Common technical skills
-    common_skills = [
-        "python", "javascript", "java", "c++", "c#", "php", "ruby", "go", "rust",
-        "html", "css", "react", "angular", "vue", "node.js", "express", "django",
-        "flask", "spring", "laravel", "sql", "mysql", "postgresql", "mongodb",
-        "redis", "docker", "kubernetes", "aws", "azure", "gcp", "git", "github",
-        "jenkins", "ci/cd", "agile", "scrum", "machine learning", "ai", "data science",
-        "tableau", "power bi", "excel", "word", "powerpoint", "photoshop", "illustrator",
-        "figma", "sketch", "adobe", "salesforce", "hubspot", "marketing", "seo",
-        "content writing", "project management", "leadership", "communication",
-        "teamwork", "problem solving", "analytical thinking", "research", "analysis"
-    ]
-    
-    # Convert text to lowercase for matching
-    text_lower = resume_text.lower()
-    
-    # Find skills in the resume
-    found_skills = []
-    for skill in common_skills:
-        if skill in text_lower:
-            found_skills.append(skill)
-    
-    return found_skills
+    """Extract canonical skill IDs from resume text"""
+    return extract_skills(resume_text)
 
 def extract_experience_from_resume(resume_text: str) -> str:
     """Extract experience information from resume"""
@@ -74,8 +86,42 @@ def extract_experience_from_resume(resume_text: str) -> str:
     
     return '\n'.join(experience_lines)
 
-def parse_resume(file_data: bytes, filename: str) -> dict:
-    """Main function to parse resume and extract information"""
+_resume_cache: Optional[BaseCache] = None
+_resume_cache_lock = threading.Lock()
+
+def get_resume_cache() -> BaseCache:
+    """Parsed resumes for this process, keyed by file content"""
+    global _resume_cache
+    if _resume_cache is None:
+        with _resume_cache_lock:
+            if _resume_cache is None:
+                _resume_cache = create_cache(
+                    RESUME_CACHE_BACKEND, RESUME_CACHE_MAX_ENTRIES, RESUME_CACHE_TTL_SECONDS,
+                    path=RESUME_CACHE_PATH, table="resume_cache"
+                )
+    return _resume_cache
+
+def resume_cache_key(file_data: ResumeSource, filename: str, digest: Optional[str] = None) -> str:
+    # The extension picks the extractor, so it is part of the key along with the parser and taxonomy versions
+    extension = os.path.splitext(filename.lower())[1]
+    version = f"v{PARSER_VERSION}.{get_skill_matcher().fingerprint}"
+    return f"{version}:{extension}:{digest or _source_digest(file_data)}"
+
+def parse_resume(file_data: ResumeSource, filename: str, digest: Optional[str] = None) -> dict:
+    """
+    Parse a resume, reusing the result for a file that was already parsed.
+    digest is the sha256 of file_data when the caller already has it.
+    """
+    cache = get_resume_cache()
+    key = resume_cache_key(file_data, filename, digest)
+    parsed = cache.get(key)
+    if parsed is None:
+        parsed = extract_resume(file_data, filename)
+        cache.set(key, parsed)
+    return parsed
+
+def extract_resume(file_data: ResumeSource, filename: str) -> dict:
+    """Extract text, skills and experience from a resume file"""
     resume_text = ""
     
     if filename.lower().endswith('.pdf'):
@@ -85,6 +131,10 @@ def parse_resume(file_data: bytes, filename: str) -> dict:
     else:
         raise ValueError("Unsupported file format. Please upload PDF or DOCX files.")
     
+    return build_parsed_resume(resume_text)
+
+def build_parsed_resume(resume_text: str) -> dict:
+    """Skills, experience and word count for extracted resume text"""
     if not resume_text:
         raise ValueError("Could not extract text from the uploaded file.")
     
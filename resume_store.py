@@ -0,0 +1,145 @@
+"""
+Content-addressed storage for uploaded resumes. Files are named by the sha256
+of their bytes and sharded into two directory levels (ab/cd/abcd...), so equal
+uploads are stored once and a preference row only keeps the 64-character hash.
+"""
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+RESUME_STORE_PATH = os.getenv("RESUME_STORE_PATH", "./resume_store")
+RESUME_READ_CHUNK_BYTES = 64 * 1024
+RESUME_MAX_UPLOAD_BYTES = int(os.getenv("RESUME_MAX_UPLOAD_MB", 10)) * 1024 * 1024
+
+_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+
+def resume_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResumeTooLarge(ValueError):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"File size too large. Maximum {max_bytes // (1024 * 1024)}MB allowed")
+
+
+class ResumeStore:
+    """Write-once blob store on the local filesystem"""
+
+    def __init__(self, root: str = RESUME_STORE_PATH):
+        self.root = os.path.abspath(root)
+
+    def path(self, digest: str) -> str:
+        if not _DIGEST.match(digest or ""):
+            raise ValueError(f"Invalid resume digest: {digest!r}")
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def size(self, digest: str) -> int:
+        return os.path.getsize(self.path(digest))
+
+    def put(self, data: bytes, digest: Optional[str] = None) -> str:
+        """Store data and return its sha256; storing the same bytes again is a no-op"""
+        digest = digest or resume_digest(data)
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temp file in the same directory so the rename is atomic
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return digest
+
+    def put_stream(self, stream: BinaryIO, max_bytes: Optional[int] = RESUME_MAX_UPLOAD_BYTES) -> Tuple[str, int]:
+        """
+        Copy a file object into the store in fixed-size chunks, hashing as it goes,
+        so memory use does not grow with the file. Returns the sha256 and size.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        sha256 = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    chunk = stream.read(RESUME_READ_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise ResumeTooLarge(max_bytes)
+                    sha256.update(chunk)
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+
+            digest = sha256.hexdigest()
+            path = self.path(digest)
+            if os.path.exists(path):
+                os.unlink(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+            return digest, size
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    @contextmanager
+    def open(self, digest: str) -> Iterator[memoryview]:
+        """Memory-map a stored resume; the view is only valid inside the with block"""
+        with open(self.path(digest), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield memoryview(b"")
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    yield view
+                finally:
+                    view.release()
+
+    def read(self, digest: str) -> bytes:
+        with self.open(digest) as view:
+            return bytes(view)
+
+    def iter_chunks(self, digest: str, chunk_size: int = RESUME_READ_CHUNK_BYTES) -> Iterator[bytes]:
+        """Stream a stored resume, e.g. as a response body, without reading it all into memory"""
+        with self.open(digest) as view:
+            for start in range(0, len(view), chunk_size):
+                yield bytes(view[start:start + chunk_size])
+
+    def delete(self, digest: str):
+        try:
+            os.unlink(self.path(digest))
+        except FileNotFoundError:
+            pass
+
+_resume_store: Optional[ResumeStore] = None
+
+def get_resume_store() -> ResumeStore:
+    global _resume_store
+    if _resume_store is None:
+        _resume_store = ResumeStore()
+    return _resume_store
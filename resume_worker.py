@@ -0,0 +1,239 @@
+"""
+Background parsing for uploaded resumes. /save-preferences stores the file and
+queues a resume_jobs row; this worker claims pending jobs with a lease, parses
+them in the resume extraction pool and writes the text and skills back to the
+user's preferences. Jobs that fail transiently are retried with backoff.
+
+Runs inside the API process by default; set RESUME_WORKER_ENABLED=False to run
+it separately with `python -m backend.resume_worker`.
+"""
+import argparse
+import asyncio
+import os
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from . import models, database, auth
+from .resume_extraction import ResumeExtractionUnavailable, parse_resume_async, shutdown_resume_pool
+from .resume_store import get_resume_store
+from .preference_index import sync_preference_terms, update_preference_index
+
+load_dotenv()
+
+RESUME_WORKER_ENABLED = os.getenv("RESUME_WORKER_ENABLED", "True").lower() == "true"
+RESUME_JOB_BATCH_SIZE = int(os.getenv("RESUME_JOB_BATCH_SIZE", 16))
+RESUME_JOB_POLL_SECONDS = float(os.getenv("RESUME_JOB_POLL_SECONDS", 2))
+RESUME_JOB_MAX_ATTEMPTS = int(os.getenv("RESUME_JOB_MAX_ATTEMPTS", 3))
+RESUME_JOB_CLAIM_LEASE_SECONDS = int(os.getenv("RESUME_JOB_CLAIM_LEASE_SECONDS", 300))
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _due_filter(now: datetime):
+    # Rows stuck in "processing" belong to a worker whose lease has run out
+    return and_(
+        models.ResumeJob.status.in_(("pending", "processing")),
+        or_(
+            models.ResumeJob.next_attempt_at == None,
+            models.ResumeJob.next_attempt_at <= now
+        )
+    )
+
+def claim_resume_jobs(
+    db: Session,
+    batch_size: int = RESUME_JOB_BATCH_SIZE,
+    lease_seconds: int = RESUME_JOB_CLAIM_LEASE_SECONDS
+) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+    """Claim up to batch_size due jobs; returns the claim token and job snapshots"""
+    now = _utcnow()
+    due = _due_filter(now)
+    candidate_ids = [
+        row.id for row in db.query(models.ResumeJob.id)
+        .filter(due)
+        .order_by(models.ResumeJob.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    ]
+    if not candidate_ids:
+        db.rollback()
+        return None, []
+
+    token = str(uuid.uuid4())
+    db.query(models.ResumeJob).filter(
+        models.ResumeJob.id.in_(candidate_ids), due
+    ).update(
+        {
+            models.ResumeJob.status: "processing",
+            models.ResumeJob.claim_token: token,
+            models.ResumeJob.next_attempt_at: now + timedelta(seconds=lease_seconds),
+            models.ResumeJob.attempts: models.ResumeJob.attempts + 1,
+        },
+        synchronize_session=False
+    )
+    db.commit()
+
+    rows = db.query(
+        models.ResumeJob.id,
+        models.ResumeJob.user_id,
+        models.ResumeJob.resume_filename,
+        models.ResumeJob.resume_sha256,
+        models.ResumeJob.attempts,
+    ).filter(
+        models.ResumeJob.id.in_(candidate_ids),
+        models.ResumeJob.claim_token == token
+    ).order_by(models.ResumeJob.id).all()
+    return token, [dict(row._mapping) for row in rows]
+
+def complete_resume_job(db: Session, job: Dict[str, Any], token: str, parsed: dict) -> bool:
+    """
+    Record the parsed resume on the job and, unless a newer upload has been
+    queued since, on the user's preferences. Returns False if the claim was lost.
+    """
+    now = _utcnow()
+    owned = db.query(models.ResumeJob).filter(
+        models.ResumeJob.id == job["id"],
+        models.ResumeJob.claim_token == token
+    ).update(
+        {
+            models.ResumeJob.status: "done",
+            models.ResumeJob.skills: ",".join(parsed["skills"]),
+            models.ResumeJob.error: None,
+            models.ResumeJob.claim_token: None,
+            models.ResumeJob.finished_at: now,
+        },
+        synchronize_session=False
+    )
+    if not owned:
+        db.rollback()
+        return False
+
+    latest_job_id = db.query(models.ResumeJob.id).filter(
+        models.ResumeJob.user_id == job["user_id"]
+    ).order_by(models.ResumeJob.id.desc()).limit(1).scalar()
+    pref = db.query(models.UserPreference).filter(models.UserPreference.user_id == job["user_id"]).first()
+    updated_skills = None
+    if pref is not None and latest_job_id == job["id"]:
+        skills = [s for s in (pref.skills or "").split(",") if s]
+        updated_skills = skills + [s for s in parsed["skills"] if s not in skills]
+        pref.skills = ",".join(updated_skills)
+        pref.resume_filename = job["resume_filename"]
+        pref.resume_sha256 = job["resume_sha256"]
+        pref.resume_content = parsed["text"]
+        companies = [c for c in (pref.preferred_companies or "").split(",") if c]
+        job_title, location = pref.job_title, pref.location
+        sync_preference_terms(db, pref.id, pref.user_id, updated_skills, companies)
+    db.commit()
+    auth.invalidate_preferences(job["user_id"])
+    if updated_skills is not None:
+        update_preference_index(job["user_id"], updated_skills, companies, job_title, location)
+    return True
+
+def fail_resume_job(db: Session, job: Dict[str, Any], token: str, error: Exception, permanent: bool):
+    now = _utcnow()
+    if permanent or job["attempts"] >= RESUME_JOB_MAX_ATTEMPTS:
+        update = {models.ResumeJob.status: "failed", models.ResumeJob.finished_at: now}
+    else:
+        delay = min(10 * (2 ** (job["attempts"] - 1)), 600) * random.uniform(0.8, 1.2)
+        update = {models.ResumeJob.status: "pending", models.ResumeJob.next_attempt_at: now + timedelta(seconds=delay)}
+    update.update({models.ResumeJob.error: str(error)[:1000], models.ResumeJob.claim_token: None})
+    db.query(models.ResumeJob).filter(
+        models.ResumeJob.id == job["id"],
+        models.ResumeJob.claim_token == token
+    ).update(update, synchronize_session=False)
+    db.commit()
+
+
+class ResumeWorker:
+    """Parses claimed resume jobs concurrently; the extraction pool bounds the CPU work"""
+
+    def __init__(self, batch_size: int = RESUME_JOB_BATCH_SIZE, poll_seconds: float = RESUME_JOB_POLL_SECONDS):
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self._wake = asyncio.Event()
+
+    def wake(self):
+        """Check for new jobs now instead of at the next poll"""
+        self._wake.set()
+
+    def _claim_batch(self):
+        with database.SessionLocal() as db:
+            return claim_resume_jobs(db, self.batch_size)
+
+    def _complete(self, job: Dict[str, Any], token: str, parsed: dict) -> bool:
+        with database.SessionLocal() as db:
+            return complete_resume_job(db, job, token, parsed)
+
+    def _fail(self, job: Dict[str, Any], token: str, error: Exception, permanent: bool):
+        with database.SessionLocal() as db:
+            fail_resume_job(db, job, token, error, permanent)
+
+    async def process_job(self, job: Dict[str, Any], token: str) -> bool:
+        """Parse one job's resume; returns whether it succeeded"""
+        store = get_resume_store()
+        try:
+            parsed = await parse_resume_async(
+                store.path(job["resume_sha256"]), job["resume_filename"], digest=job["resume_sha256"]
+            )
+        except ResumeExtractionUnavailable as e:
+            # A timeout or a broken pool may be another document's doing; retried with backoff up to the attempt limit
+            print(f"Resume job {job['id']} will be retried: {e}")
+            await run_in_threadpool(self._fail, job, token, e, False)
+            return False
+        except ValueError as e:
+            # Unsupported, unreadable or over-limit documents fail the same way on every attempt
+            await run_in_threadpool(self._fail, job, token, e, True)
+            return False
+        except Exception as e:
+            print(f"Resume job {job['id']} failed: {e}")
+            await run_in_threadpool(self._fail, job, token, e, False)
+            return False
+        return await run_in_threadpool(self._complete, job, token, parsed)
+
+    async def run_once(self) -> Dict[str, int]:
+        """Claim and process one batch of due jobs"""
+        token, batch = await run_in_threadpool(self._claim_batch)
+        if not batch:
+            return {"claimed": 0, "done": 0, "failed": 0}
+        results = await asyncio.gather(*(self.process_job(job, token) for job in batch))
+        done = sum(1 for ok in results if ok)
+        return {"claimed": len(batch), "done": done, "failed": len(batch) - done}
+
+    async def run_forever(self):
+        while True:
+            try:
+                stats = await self.run_once()
+            except Exception as e:
+                print(f"Resume worker error: {e}")
+                stats = {"claimed": 0}
+            # Keep draining while there is a backlog; otherwise wait for a wake-up or the next poll
+            if stats["claimed"] < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse uploaded resumes")
+    parser.add_argument("--once", action="store_true", help="Process one batch and exit")
+    args = parser.parse_args()
+
+    worker = ResumeWorker()
+    try:
+        if args.once:
+            print(asyncio.run(worker.run_once()))
+        else:
+            asyncio.run(worker.run_forever())
+    finally:
+        shutdown_resume_pool()
+
+if __name__ == "__main__":
+    main()
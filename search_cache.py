@@ -0,0 +1,319 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Search cache configuration
+SEARCH_CACHE_BACKEND = os.getenv("SEARCH_CACHE_BACKEND", "memory")  # memory, sqlite or none
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", 3600))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", 1000))
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", "./search_cache.db")
+
+def normalize_text(value: Optional[str]) -> str:
+    """Lowercase and collapse whitespace so equivalent queries share a key"""
+    return " ".join((value or "").lower().split())
+
+def _normalize_list(values: Optional[List[str]]) -> List[str]:
+    """Normalize, de-duplicate and sort a list of free-text values"""
+    normalized = {normalize_text(v) for v in values or []}
+    normalized.discard("")
+    return sorted(normalized)
+
+def resume_fingerprint(resume_content: Optional[str]) -> Optional[str]:
+    """Stable fingerprint of the resume text that is sent to the model"""
+    text = normalize_text(resume_content)
+    if not text:
+        return None
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def make_search_key(
+    job_title: str,
+    location: str,
+    skills: List[str] = None,
+    preferred_companies: List[str] = None,
+    resume_content: str = None
+) -> str:
+    """Build the cache key for a job search from its normalized criteria"""
+    key_parts = [
+        normalize_text(job_title),
+        normalize_text(location),
+        _normalize_list(skills),
+        _normalize_list(preferred_companies),
+        resume_fingerprint(resume_content),
+    ]
+    raw_key = json.dumps(key_parts, separators=(",", ":"))
+    return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+
+class CacheStats:
+    """Thread-safe hit/miss counters for a cache instance"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "sets": self.sets,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class BaseCache(ABC):
+    """Common get/set interface; values are stored as JSON so callers never share objects"""
+
+    backend = "base"
+    # Whether get/set may block on I/O and should be kept off the event loop
+    blocking = False
+
+    def __init__(self, max_entries: int = SEARCH_CACHE_MAX_ENTRIES, ttl_seconds: int = SEARCH_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self._get(key)
+        if raw is None:
+            self.stats.incr("misses")
+            return None
+        self.stats.incr("hits")
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any):
+        self._set(key, json.dumps(value))
+        self.stats.incr("sets")
+
+    def describe(self) -> Dict[str, Any]:
+        info = {
+            "backend": self.backend,
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+        }
+        info.update(self.stats.as_dict())
+        return info
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _set(self, key: str, raw: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class NullCache(BaseCache):
+    """Cache that never stores anything (SEARCH_CACHE_BACKEND=none)"""
+
+    backend = "none"
+
+    def _get(self, key):
+        return None
+
+    def _set(self, key, raw):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+class MemoryCache(BaseCache):
+    """In-process LRU cache with a per-entry TTL"""
+
+    backend = "memory"
+
+    def __init__(self, max_entries: int = SEARCH_CACHE_MAX_ENTRIES, ttl_seconds: int = SEARCH_CACHE_TTL_SECONDS):
+        super().__init__(max_entries, ttl_seconds)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, raw = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.stats.incr("expirations")
+                return None
+            self._entries.move_to_end(key)
+            return raw
+
+    def _set(self, key, raw):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, raw)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.incr("evictions")
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteCache(BaseCache):
+    """File-backed LRU cache that can be shared by several worker processes on one host"""
+
+    backend = "sqlite"
+    blocking = True
+
+    def __init__(
+        self,
+        path: str = SEARCH_CACHE_PATH,
+        max_entries: int = SEARCH_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = SEARCH_CACHE_TTL_SECONDS,
+        table: str = "search_cache"
+    ):
+        super().__init__(max_entries, ttl_seconds)
+        self.path = path
+        self.table = table
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS ix_{table}_last_access ON {table} (last_access)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _get(self, key):
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            row = conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            raw, expires_at = row
+            if expires_at <= now:
+                conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.stats.incr("expirations")
+                return None
+            conn.execute(f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (now, key))
+        return raw
+
+    def _set(self, key, raw):
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (key, raw, now + self.ttl_seconds, now)
+            )
+            conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+            (count,) = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+            overflow = count - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY last_access LIMIT ?)",
+                    (overflow,)
+                )
+                self.stats.incr("evictions", overflow)
+
+    def delete(self, key):
+        conn = self._connect()
+        with conn:
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute(f"DELETE FROM {self.table}")
+
+    def __len__(self):
+        (count,) = self._connect().execute(
+            f"SELECT COUNT(*) FROM {self.table} WHERE expires_at > ?", (time.time(),)
+        ).fetchone()
+        return count
+
+
+def create_cache(
+    backend: str = SEARCH_CACHE_BACKEND,
+    max_entries: int = SEARCH_CACHE_MAX_ENTRIES,
+    ttl_seconds: int = SEARCH_CACHE_TTL_SECONDS,
+    path: str = SEARCH_CACHE_PATH,
+    table: str = "search_cache"
+) -> BaseCache:
+    """Create a cache instance for the configured backend; path and table only apply to sqlite"""
+    backend = (backend or "memory").lower()
+    if backend == "memory":
+        return MemoryCache(max_entries, ttl_seconds)
+    if backend in ("sqlite", "file"):
+        return SQLiteCache(path, max_entries, ttl_seconds, table)
+    if backend == "none":
+        return NullCache(max_entries, ttl_seconds)
+    raise ValueError(f"Unsupported cache backend: {backend}")
+
+_search_cache: Optional[BaseCache] = None
+_search_cache_lock = threading.Lock()
+
+def get_search_cache() -> BaseCache:
+    """Shared search cache for this process"""
+    global _search_cache
+    if _search_cache is None:
+        with _search_cache_lock:
+            if _search_cache is None:
+                _search_cache = create_cache()
+    return _search_cache
@@ -0,0 +1,215 @@
+"""
+Skill extraction with an Aho-Corasick automaton. All skill names and aliases in
+the taxonomy are compiled once, then a text is scanned in a single pass and
+only matches that start and end on a token boundary are kept, so "go" is not
+found in "google" nor "ai" in "maintain". Results are canonical skill IDs.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+SKILL_TAXONOMY_PATH = os.getenv("SKILL_TAXONOMY_PATH")  # JSON: {"skill id": ["alias", ...], ...}
+
+# Built-in taxonomy: canonical skill ID -> aliases. The ID itself always matches too.
+DEFAULT_SKILL_TAXONOMY: Dict[str, List[str]] = {
+    "python": ["python3"],
+    "javascript": ["js", "ecmascript", "es6"],
+    "typescript": ["ts"],
+    "java": [],
+    "c++": ["cpp"],
+    "c#": ["csharp", "c sharp"],
+    "php": [],
+    "ruby": [],
+    "go": ["golang"],
+    "rust": [],
+    "kotlin": [],
+    "swift": [],
+    "scala": [],
+    "html": ["html5"],
+    "css": ["css3"],
+    "react": ["react.js", "reactjs"],
+    "angular": ["angularjs", "angular.js"],
+    "vue": ["vue.js", "vuejs"],
+    "node.js": ["nodejs", "node js"],
+    "express": ["express.js", "expressjs"],
+    "django": [],
+    "flask": [],
+    "fastapi": [],
+    "spring": ["spring boot", "springboot"],
+    "laravel": [],
+    "graphql": [],
+    "rest api": ["rest apis", "restful", "restful api", "restful apis"],
+    "sql": [],
+    "mysql": [],
+    "postgresql": ["postgres", "psql"],
+    "mongodb": ["mongo"],
+    "redis": [],
+    "elasticsearch": ["elastic search"],
+    "kafka": ["apache kafka"],
+    "spark": ["apache spark", "pyspark"],
+    "docker": [],
+    "kubernetes": ["k8s"],
+    "terraform": [],
+    "linux": [],
+    "aws": ["amazon web services"],
+    "azure": ["microsoft azure"],
+    "gcp": ["google cloud", "google cloud platform"],
+    "git": [],
+    "github": [],
+    "jenkins": [],
+    "ci/cd": ["ci cd", "continuous integration", "continuous delivery", "continuous deployment"],
+    "agile": [],
+    "scrum": [],
+    "machine learning": ["ml"],
+    "deep learning": [],
+    "ai": ["artificial intelligence"],
+    "nlp": ["natural language processing"],
+    "data science": [],
+    "pandas": [],
+    "numpy": [],
+    "pytorch": [],
+    "tensorflow": [],
+    "scikit-learn": ["sklearn", "scikit learn"],
+    "tableau": [],
+    "power bi": ["powerbi"],
+    "excel": ["microsoft excel", "ms excel"],
+    "word": ["microsoft word", "ms word"],
+    "powerpoint": ["microsoft powerpoint", "ms powerpoint"],
+    "photoshop": ["adobe photoshop"],
+    "illustrator": ["adobe illustrator"],
+    "figma": [],
+    "sketch": [],
+    "adobe": [],
+    "salesforce": [],
+    "hubspot": [],
+    "marketing": ["digital marketing"],
+    "seo": ["search engine optimization"],
+    "content writing": ["copywriting"],
+    "project management": [],
+    "leadership": [],
+    "communication": ["communication skills"],
+    "teamwork": ["team work"],
+    "problem solving": ["problem-solving"],
+    "analytical thinking": [],
+    "research": [],
+    "analysis": [],
+}
+
+_WHITESPACE = re.compile(r"\s+")
+
+def _normalize(text: str) -> str:
+    return _WHITESPACE.sub(" ", text.lower())
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class SkillMatcher:
+    """Compiled automaton over every name and alias in a skill taxonomy"""
+
+    def __init__(self, taxonomy: Dict[str, Iterable[str]]):
+        taxonomy = {skill_id: sorted(aliases) for skill_id, aliases in taxonomy.items()}
+        # Identifies the taxonomy, so results cached under another one can be told apart
+        self.fingerprint = hashlib.sha256(json.dumps(taxonomy, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+        self.skill_ids: List[str] = []
+        self.aliases: Dict[str, str] = {}
+        # Per state: outgoing edges, failure link, and (skill index, pattern length) outputs
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[tuple]] = [[]]
+
+        for skill_id, aliases in taxonomy.items():
+            index = len(self.skill_ids)
+            self.skill_ids.append(skill_id)
+            for pattern in {_normalize(name).strip() for name in [skill_id, *aliases]}:
+                if pattern:
+                    self.aliases.setdefault(pattern, skill_id)
+                    self._add_pattern(pattern, index)
+        self._build_failure_links()
+
+    def _add_pattern(self, pattern: str, skill_index: int):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = next_state
+        self._outputs[state].append((skill_index, len(pattern)))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                # Inherit the matches of the longest proper suffix
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+
+    def find(self, text: Optional[str]) -> List[str]:
+        """Canonical IDs of the skills mentioned in text, in order of first mention"""
+        text = _normalize(text or "")
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        found: Dict[int, None] = {}
+        state = 0
+        end = len(text)
+
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for skill_index, length in outputs[state]:
+                if skill_index in found:
+                    continue
+                start = position - length + 1
+                # Token boundary on both sides; only checked where the pattern edge is itself a word character
+                if start > 0 and _is_word_char(text[start]) and _is_word_char(text[start - 1]):
+                    continue
+                if position + 1 < end and _is_word_char(char) and _is_word_char(text[position + 1]):
+                    continue
+                found[skill_index] = None
+
+        return [self.skill_ids[i] for i in found]
+
+def load_skill_taxonomy(path: Optional[str] = SKILL_TAXONOMY_PATH) -> Dict[str, List[str]]:
+    """The taxonomy from a JSON file when configured, otherwise the built-in one"""
+    if not path:
+        return DEFAULT_SKILL_TAXONOMY
+    with open(path, encoding="utf-8") as f:
+        taxonomy = json.load(f)
+    return {str(skill_id).lower(): list(aliases or []) for skill_id, aliases in taxonomy.items()}
+
+_skill_matcher: Optional[SkillMatcher] = None
+_skill_matcher_lock = threading.Lock()
+
+def get_skill_matcher() -> SkillMatcher:
+    """Shared matcher for this process, compiled on first use"""
+    global _skill_matcher
+    if _skill_matcher is None:
+        with _skill_matcher_lock:
+            if _skill_matcher is None:
+                _skill_matcher = SkillMatcher(load_skill_taxonomy())
+    return _skill_matcher
+
+def canonical_skill(name: Optional[str]) -> str:
+    """Canonical ID for a skill the user typed, e.g. "K8s" -> "kubernetes"; unknown skills are just normalized"""
+    name = _normalize(name or "").strip()
+    return get_skill_matcher().aliases.get(name, name)
+
+def extract_skills(text: Optional[str]) -> List[str]:
+    return get_skill_matcher().find(text)
+
+def tag_job_skills(job: Dict[str, object]) -> List[str]:
+    """Skills mentioned in a job's title and description"""
+    return extract_skills(f"{job.get('title') or ''}\n{job.get('description') or ''}")
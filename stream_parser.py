@@ -0,0 +1,172 @@
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+# Largest single job object we are willing to buffer before giving up on it
+MAX_OBJECT_CHARS = 64 * 1024
+
+# Characters that matter at each level of the scan; everything else is skipped in bulk
+_ARRAY_LEVEL = re.compile(r'[{\]"]')
+_OBJECT_LEVEL = re.compile(r'[{}\[\]"]')
+_STRING_LEVEL = re.compile(r'["\\]')
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+class JobStreamParser:
+    """
+    Incremental parser for a JSON array of job objects embedded in LLM output.
+
+    Text is fed in chunks as it arrives and every character is scanned once.
+    Each top-level object in the array is decoded as soon as its closing brace
+    is seen, so one malformed object only loses that object. Prose, code fences
+    and garbage between or after objects are skipped, and a truncated object
+    at the end of the stream is dropped. Only the object currently being read
+    is buffered; one that grows past max_object_chars is dropped, and the rest
+    of it is scanned without buffering until it closes.
+    """
+
+    def __init__(self, max_object_chars: int = MAX_OBJECT_CHARS):
+        self.max_object_chars = max_object_chars
+        self.errors = 0
+        self._in_array = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._parts: List[str] = []
+        self._object_chars = 0
+        self._skipping = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume the next chunk of text and return the job objects it completed"""
+        jobs = []
+        pos = 0
+        end = len(chunk)
+        object_start: Optional[int] = 0 if self._depth and not self._skipping else None
+
+        while pos < end:
+            if self._escape:
+                self._escape = False
+                pos += 1
+                continue
+
+            if self._in_string:
+                match = _STRING_LEVEL.search(chunk, pos)
+                if match is None:
+                    pos = end
+                    break
+                pos = match.end()
+                if match.group() == "\\":
+                    self._escape = True
+                else:
+                    self._in_string = False
+                continue
+
+            if self._depth == 0:
+                if not self._in_array:
+                    start = chunk.find("[", pos)
+                    if start == -1:
+                        pos = end
+                        break
+                    self._in_array = True
+                    pos = start + 1
+                    continue
+
+                match = _ARRAY_LEVEL.search(chunk, pos)
+                if match is None:
+                    pos = end
+                    break
+                pos = match.end()
+                token = match.group()
+                if token == "{":
+                    self._depth = 1
+                    object_start = match.start()
+                elif token == '"':
+                    # A bare string in the array; skip it so braces inside it are ignored
+                    self._in_string = True
+                else:
+                    # End of this array; a later one (e.g. after "[20] jobs" prose) may follow
+                    self._in_array = False
+                continue
+
+            match = _OBJECT_LEVEL.search(chunk, pos)
+            if match is None:
+                pos = end
+                break
+            pos = match.end()
+            token = match.group()
+            if token == '"':
+                self._in_string = True
+            elif token in "{[":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    if self._skipping:
+                        self._skipping = False
+                    elif self._object_chars + pos - object_start > self.max_object_chars:
+                        self._drop_object()
+                    else:
+                        self._parts.append(chunk[object_start:pos])
+                        job = self._decode_object()
+                        if job is not None:
+                            jobs.append(job)
+                    object_start = None
+
+        if self._depth and object_start is not None:
+            self._object_chars += end - object_start
+            if self._object_chars > self.max_object_chars:
+                # Keep tracking strings and nesting so the scan resumes after this object
+                self._drop_object()
+                self._skipping = True
+            else:
+                self._parts.append(chunk[object_start:])
+
+        return jobs
+
+    def close(self) -> List[Dict[str, Any]]:
+        """Signal the end of the stream; an unfinished object is counted as an error and dropped"""
+        if self._depth and not self._skipping:
+            self.errors += 1
+        self._reset_object()
+        self._in_array = False
+        return []
+
+    def _decode_object(self) -> Optional[Dict[str, Any]]:
+        text = "".join(self._parts)
+        self._parts = []
+        self._object_chars = 0
+        try:
+            job = json.loads(text)
+        except json.JSONDecodeError:
+            # Models often leave a trailing comma before a closing brace
+            try:
+                job = json.loads(_TRAILING_COMMA.sub(r"\1", text))
+            except json.JSONDecodeError:
+                self.errors += 1
+                return None
+        if not isinstance(job, dict):
+            self.errors += 1
+            return None
+        return job
+
+    def _drop_object(self):
+        self.errors += 1
+        self._parts = []
+        self._object_chars = 0
+
+    def _reset_object(self):
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._parts = []
+        self._object_chars = 0
+        self._skipping = False
+
+def parse_job_objects(text: str) -> List[Dict[str, Any]]:
+    """Parse every complete job object in a full response text"""
+    parser = JobStreamParser()
+    jobs = parser.feed(text)
+    jobs.extend(parser.close())
+    if parser.errors:
+        print(f"Skipped {parser.errors} malformed job object(s) in response")
+    return jobs
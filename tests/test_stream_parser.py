@@ -0,0 +1,36 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stream_parser import JobStreamParser
+
+
+def _feed_in_chunks(parser: JobStreamParser, text: str, size: int):
+    jobs = []
+    for start in range(0, len(text), size):
+        jobs.extend(parser.feed(text[start:start + size]))
+    jobs.extend(parser.close())
+    return jobs
+
+
+OVERSIZED = '[{"a":"' + "x" * 50 + '", "inner":{"title":"bad"}},{"ok":1}]'
+
+
+def test_oversized_object_is_skipped_and_parsing_resumes():
+    parser = JobStreamParser(max_object_chars=20)
+    assert _feed_in_chunks(parser, OVERSIZED, 10) == [{"ok": 1}]
+    assert parser.errors == 1
+
+
+def test_oversized_object_within_one_chunk_is_dropped():
+    parser = JobStreamParser(max_object_chars=20)
+    assert _feed_in_chunks(parser, OVERSIZED, len(OVERSIZED)) == [{"ok": 1}]
+    assert parser.errors == 1
+
+
+def test_braces_in_strings_of_skipped_object_do_not_break_sync():
+    text = '[{"a":"' + "}" * 30 + ']", "b":"\\"}"},{"ok":2}]'
+    parser = JobStreamParser(max_object_chars=10)
+    assert _feed_in_chunks(parser, text, 7) == [{"ok": 2}]
+    assert parser.errors == 1
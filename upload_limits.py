@@ -0,0 +1,49 @@
+from typing import Iterable
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+from .resume_store import RESUME_MAX_UPLOAD_BYTES
+
+# Room for the other form fields and multipart boundaries around the file
+FORM_OVERHEAD_BYTES = 256 * 1024
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject request bodies over max_bytes on the given paths while they stream in,
+    before the multipart parser has spooled the whole upload.
+    """
+
+    def __init__(self, app, paths: Iterable[str], max_bytes: int = RESUME_MAX_UPLOAD_BYTES + FORM_OVERHEAD_BYTES):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.max_bytes = max_bytes
+
+    def _too_large(self) -> HTTPException:
+        return HTTPException(status_code=413, detail=f"Request too large. Maximum {self.max_bytes // (1024 * 1024)}MB allowed")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            error = self._too_large()
+            await JSONResponse({"detail": error.detail}, status_code=error.status_code)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            # Chunked uploads have no Content-Length, so count what actually arrives
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise self._too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)